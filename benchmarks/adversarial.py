@@ -0,0 +1,80 @@
+"""Times parsing of pathological headers, and checks that it stays linear.
+
+Each case is parsed at doubling sizes. The run fails if the time per KiB at the
+largest size exceeds GROWTH times that at the smallest, or LIMIT ms per KiB.
+
+Run from the repository root: python -m benchmarks.adversarial
+"""
+import sys, time, random
+import cppgen.nodes as nodes
+
+SIZES = (32, 64, 128, 256)  # KiB
+GROWTH = 2.5
+LIMIT = 5.0
+
+def repeat(unit: str, kib: int) -> str:
+    return unit * (kib * 1024 // len(unit) + 1)
+
+def unterminated(kib: int) -> str:
+    """Declarations that never reach a ';'"""
+    return repeat('int f(int a, int b) const noexcept\n', kib) + ';\n'
+
+def unbalanced(kib: int) -> str:
+    """Parameter lists that are never closed"""
+    return repeat('void g(const std::vector<int> &v, ', kib) + ';\n'
+
+def unclosed(kib: int) -> str:
+    """Parameter lists left open after parentheses in attributes and template parameters"""
+    return repeat('__attribute__((x)) void f(int;\ntemplate <int (N)> void g(int;\n', kib)
+
+def qualified(kib: int) -> str:
+    """A very long qualified name followed by something other than '('"""
+    return 'namespace n {\n' + repeat('a::', kib) + 'b c;\n}\n'
+
+def templates(kib: int) -> str:
+    """Template arguments nested deeper than a recursive pattern unrolls"""
+    depth = kib * 1024 // 16
+    return 'std::vector<' * depth + 'int' + '>' * depth + ' h(int x);\n'
+
+def defaults(kib: int) -> str:
+    """One declaration with a huge default argument"""
+    return 'int k(int a = ' + repeat('(1 + ', kib // 2) + '0' + repeat(')', kib // 2) + ');\n'
+
+def junk(kib: int) -> str:
+    """Random declaration-like tokens without ';'"""
+    rnd = random.Random(kib)
+    alphabet = ['int', 'const', 'T', '::', '<', '>', '(', ')', '*', '&', ',', 'f', 'noexcept', '\n']
+    return ' '.join(rnd.choice(alphabet) for _ in range(kib * 1024 // 4)) + ';\n'
+
+def functions(kib: int) -> str:
+    """Ordinary declarations, for comparison"""
+    return 'class C {\npublic:\n' + repeat('    const std::string &name(int index, Widget *w) const;\n', kib) + '};\n'
+
+CASES = [unterminated, unbalanced, unclosed, qualified, templates, defaults, junk, functions]
+
+def measure(source: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        nodes.Tree(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f'{"case":>14} ' + ' '.join(f'{f"{kib} KiB":>10}' for kib in SIZES) + f' {"growth":>8}')
+    failed = []
+    for case in CASES:
+        per_kib = []
+        for kib in SIZES:
+            source = case(kib)
+            per_kib.append(measure(source) * 1000 / (len(source) / 1024))
+        growth = per_kib[-1] / per_kib[0]
+        print(f'{case.__name__:>14} ' + ' '.join(f'{ms:>10.3f}' for ms in per_kib) + f' {growth:>7.1f}x')
+        if growth > GROWTH or per_kib[-1] > LIMIT:
+            failed.append(case.__name__)
+    print('ms per KiB')
+    if failed:
+        sys.exit(f'Not linear: {", ".join(failed)}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+"""Compares two result files of benchmarks.run.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import sys, json
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    with open(sys.argv[1]) as f:
+        before = json.load(f)
+    with open(sys.argv[2]) as f:
+        after = json.load(f)
+    if before['shape'] != after['shape']:
+        print('Warning: the results are for different shapes')
+    print(f'{"":>20} {"before ms":>10} {"after ms":>10} {"ratio":>7}')
+    for key, old in before['seconds'].items():
+        new = after['seconds'].get(key)
+        if new is None:
+            continue
+        print(f'{key:>20} {old * 1000:>10.2f} {new * 1000:>10.2f} {new / old if old else float("nan"):>7.2f}')
+
+if __name__ == '__main__':
+    main()
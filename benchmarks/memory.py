@@ -0,0 +1,41 @@
+"""Measures the memory held by a parsed Tree and the time to parse and group it.
+
+Run from the repository root: python -m benchmarks.memory
+"""
+import gc, time, tracemalloc
+import cppgen.nodes as nodes
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+from benchmarks.synth import Shape, header
+
+def main():
+    shape = Shape(namespaces=40, depth=3, classes=1000, templated=100, methods=20, params=4)
+    source = header(shape)
+    print(f'{len(source) / 1024:.1f} KiB header')
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree = nodes.Tree(source)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f'{len(tree.namespaces)} namespaces, {len(tree.classes)} classes, {len(tree.functions)} functions')
+    print(f'{"tree memory":>20} {size / 1024:>10.1f} KiB')
+    print(f'{"per node":>20} {size / (len(tree.namespaces) + len(tree.classes) + len(tree.functions)):>10.1f} B')
+
+    start = time.perf_counter()
+    nodes.Tree(source)
+    print(f'{"parse":>20} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+    start = time.perf_counter()
+    for ns in [None] + tree.root_namespaces:
+        for fn in tree.get_functions_for(ns):
+            fn.rel_name
+    print(f'{"group + names":>20} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+    start = time.perf_counter()
+    generate('synthetic.hpp', Convention(), tree)
+    print(f'{"render":>20} {(time.perf_counter() - start) * 1000:>10.1f} ms')
+
+if __name__ == '__main__':
+    main()
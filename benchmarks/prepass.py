@@ -0,0 +1,29 @@
+"""Measures the pre-pass on headers with more and more documentation.
+
+Run from the repository root: python -m benchmarks.prepass
+"""
+import time
+import cppgen.nodes as nodes
+from cppgen.prepass import reduce
+from benchmarks.synth import Shape, header
+
+def measure(fn, source: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f'{"docs":>6} {"KiB":>8} {"reduced":>8} {"functions":>10} {"prepass ms":>11} {"tree ms":>9}')
+    for docs in (0, 2, 8, 16):
+        source = header(Shape(namespaces=10, depth=2, classes=200, templated=20, methods=20, docs=docs))
+        reduced = reduce(source)
+        tree = nodes.Tree(source)
+        print(f'{docs:>6} {len(source) / 1024:>8.1f} {len(reduced.text) / len(source):>8.0%} '
+              f'{len(tree.functions):>10} {measure(reduce, source) * 1000:>11.1f} '
+              f'{measure(nodes.Tree, source) * 1000:>9.1f}')
+
+if __name__ == '__main__':
+    main()
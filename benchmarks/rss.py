@@ -0,0 +1,64 @@
+"""Measures the peak resident memory of generating the definitions of a large
+amalgamated header, read as text and as a memory map.
+
+Each mode runs in a fresh interpreter, as the peak only ever grows; the baseline
+is the interpreter with cppgen imported. Pages of the map count as resident once
+touched, although the kernel can drop them, as they are backed by the file.
+
+Run from the repository root: python -m benchmarks.rss [--mib 32]
+"""
+import sys, os, time, argparse, resource, subprocess, tempfile
+from os import path
+from benchmarks.synth import Shape, header
+
+MODES = ['baseline', 'text', 'mmap']
+
+def peak_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == 'darwin' else 1)
+
+def child(mode: str, filename: str) -> None:
+    import cppgen.nodes as nodes
+    from mmap import mmap, ACCESS_READ
+    from cppgen.convention import Convention
+    from cppgen.cppgen import render
+    start = time.perf_counter()
+    functions = 0
+    if mode != 'baseline':
+        with open(filename, 'r') as f:
+            source = f.read() if mode == 'text' else mmap(f.fileno(), 0, access=ACCESS_READ)
+        tree = nodes.Tree(source)
+        functions = len(tree.functions)
+        with open(os.devnull, 'w') as out:
+            for fragment in render(path.basename(filename), Convention(), tree):
+                out.write(fragment)
+    print(peak_mib(), time.perf_counter() - start, functions)
+
+def main():
+    parser = argparse.ArgumentParser(description='Peak RSS of text and memory-mapped parsing')
+    parser.add_argument('--mib', type=int, default=32, help='Size of the header (default: 32)')
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'FILE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    unit = header(Shape(namespaces=10, depth=2, classes=200, templated=20, methods=20, docs=4))
+    with tempfile.NamedTemporaryFile('w', suffix='.hpp') as f:
+        # Written a unit at a time: children start from the peak of this process
+        for _ in range(args.mib * 1024 * 1024 // len(unit) + 1):
+            f.write(unit)
+        f.flush()
+        print(f'{path.getsize(f.name) / 1024 / 1024:.1f} MiB header')
+        print(f'{"mode":>10} {"peak MiB":>10} {"over base":>10} {"seconds":>8} {"functions":>10}')
+        base = None
+        for mode in MODES:
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.rss', '--child', mode, f.name],
+                                    check=True, capture_output=True, text=True).stdout
+            peak, seconds, functions = output.split()
+            peak = float(peak)
+            base = peak if base is None else base
+            print(f'{mode:>10} {peak:>10.1f} {peak - base:>10.1f} {float(seconds):>8.2f} {functions:>10}')
+
+if __name__ == '__main__':
+    main()
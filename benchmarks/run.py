@@ -0,0 +1,74 @@
+"""Times parsing and rendering of a synthetic header.
+
+Run from the repository root, e.g.:
+    python -m benchmarks.run --classes 400 --json before.json
+"""
+import sys, json, time, argparse, platform
+from typing import Callable
+import cppgen.nodes as nodes
+from cppgen import stats
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+from benchmarks.synth import Shape, header
+
+PHASES = ['_fetch_namespaces', '_fetch_classes', '_fetch_functions']
+CONVENTIONS = ['default', 'gnu', 'google']
+
+def best(fn: Callable[[], None], repeat: int) -> float:
+    result = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        result = min(result, time.perf_counter() - start)
+    return result
+
+def run(shape: Shape, repeat: int) -> dict:
+    source = header(shape)
+    timings = {}
+    for _ in range(repeat):
+        record = stats.FileStats('synthetic.hpp')
+        start = time.perf_counter()
+        with stats.recording(record):
+            tree = nodes.Tree(source)
+        total = time.perf_counter() - start
+        for key, value in [(phase, record.seconds[phase]) for phase in PHASES] + [('tree', total)]:
+            timings[key] = min(timings.get(key, float('inf')), value)
+    timings['scan'] = timings['tree'] - sum(timings[phase] for phase in PHASES)
+    for style in CONVENTIONS:
+        conv = Convention(style=style)
+        timings['render_' + style] = best(lambda: generate('synthetic.hpp', conv, tree), repeat)
+    return {
+        'shape': shape.asdict(),
+        'python': platform.python_version(),
+        'bytes': len(source),
+        'counts': {
+            'namespaces': len(tree.namespaces),
+            'classes': len(tree.classes),
+            'functions': len(tree.functions),
+        },
+        'seconds': timings,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark nodes.Tree and rendering on a synthetic header')
+    for name, value in Shape().asdict().items():
+        parser.add_argument('--' + name, type=int, default=value)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', metavar='FILE', help='Write the results to FILE ("-": stdout)')
+    args = parser.parse_args()
+    shape = Shape(**{name: getattr(args, name) for name in Shape().asdict()})
+    result = run(shape, args.repeat)
+    if args.json == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+    print(f'{result["bytes"] / 1024:.1f} KiB, ' +
+          ', '.join(f'{count} {kind}' for kind, count in result['counts'].items()))
+    for key, value in result['seconds'].items():
+        print(f'{key:>20} {value * 1000:>10.2f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""Checks that nodes.Tree scales linearly with the header size.
+
+Run from the repository root: python -m benchmarks.scaling
+"""
+import time
+import cppgen.nodes as nodes
+from cppgen.utils import match_braces
+from benchmarks.synth import Shape, header
+
+def measure(fn, source: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    print(f'{"classes":>8} {"depth":>6} {"KiB":>8} {"scan us/KiB":>12} {"tree us/KiB":>12}')
+    for depth in (1, 16):
+        for classes in (100, 200, 400, 800, 1600):
+            source = header(Shape(namespaces=1, depth=depth, classes=classes, templated=0, methods=4))
+            kib = len(source) / 1024
+            scan = measure(match_braces, source)
+            tree = measure(nodes.Tree, source)
+            print(f'{classes:>8} {depth:>6} {kib:>8.1f} {scan / kib * 1e6:>12.1f} {tree / kib * 1e6:>12.1f}')
+
+if __name__ == '__main__':
+    main()
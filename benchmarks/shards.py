@@ -0,0 +1,42 @@
+"""Times parsing one large header in shards over more and more worker processes,
+and checks that the output is the same as that of a serial parse.
+
+Run from the repository root: python -m benchmarks.shards [--lines 50000]
+"""
+import os, sys, time, argparse
+import cppgen.nodes as nodes
+from cppgen import stats
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+from benchmarks.synth import Shape, header
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse one header in shards')
+    parser.add_argument('--lines', type=int, default=50000, help='Lines of the header (default: 50000)')
+    args = parser.parse_args()
+
+    unit = header(Shape(namespaces=2, depth=2, classes=20, templated=2, methods=20, docs=2))
+    source = unit * -(-args.lines // unit.count('\n'))
+    print(f'{source.count(chr(10))} lines, {len(source) / 1024 / 1024:.1f} MiB, {os.cpu_count()} CPUs')
+    print(f'{"jobs":>6} {"parse s":>8} {"speedup":>8} {"prepass s":>10} {"find s":>8}')
+    expected = None
+    jobs = 1
+    while True:
+        record = stats.FileStats('shards')
+        start = time.perf_counter()
+        with stats.recording(record):
+            tree = nodes.Tree(source, jobs)
+        seconds = time.perf_counter() - start
+        output = generate('shards.hpp', Convention(), tree)
+        if expected is None:
+            expected, serial = output, seconds
+        elif output != expected:
+            sys.exit(f'Output differs from the serial parse with {jobs} jobs')
+        find = sum(record.seconds[phase] for phase in ('_fetch_namespaces', '_fetch_classes', '_fetch_functions'))
+        print(f'{jobs:>6} {seconds:>8.2f} {serial / seconds:>7.1f}x {record.seconds["prepass"]:>10.2f} {find:>8.2f}')
+        if jobs >= os.cpu_count():
+            break
+        jobs = min(jobs * 2, os.cpu_count())
+
+if __name__ == '__main__':
+    main()
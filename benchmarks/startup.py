@@ -0,0 +1,50 @@
+"""Measures the wall time of short-lived cppgen and hppgen processes.
+
+Run from the repository root: python -m benchmarks.startup
+"""
+import os, sys, time, shutil, tempfile, subprocess
+from os import path
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+HEADER = '''namespace example {
+class Test {
+public:
+    Test();
+    ~Test();
+    int get() const;
+};
+}
+'''
+
+COMMANDS = {
+    'python': ['-c', 'pass'],
+    'import cppgen.nodes': ['-c', 'import cppgen.nodes'],
+    'cppgen FILE': ['-c', 'from cppgen.cppgen import main; main()', 'example.hpp', '--no-cache'],
+    'hppgen NAME': ['-c', 'from cppgen.hppgen import main; main()', 'foo::Bar'],
+}
+
+def measure(args: list[str], cwd: str, repeat: int) -> float:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    best = float('inf')
+    for _ in range(repeat):
+        for name in os.listdir(cwd):
+            if name == 'foo':
+                shutil.rmtree(path.join(cwd, name))
+            elif name != 'example.hpp':
+                os.remove(path.join(cwd, name))
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as cwd:
+        with open(path.join(cwd, 'example.hpp'), 'w') as f:
+            f.write(HEADER)
+        for name, args in COMMANDS.items():
+            print(f'{name:>20} {measure(args, cwd, repeat) * 1000:>8.1f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Synthetic C++ headers for benchmarks."""
+from dataclasses import dataclass, asdict
+
+TYPES = ['int', 'const std::string &', 'double', 'std::vector<int>', 'const Widget *',
+         'std::map<std::string, std::vector<int>> &', 'unsigned long', 'bool']
+RETURNS = ['void', 'int', 'const std::string &', 'Widget *', 'std::vector<int>', 'bool']
+TAILS = ['', ' const', ' noexcept', ' const noexcept']
+
+@dataclass
+class Shape:
+    namespaces: int = 4
+    depth: int = 2
+    classes: int = 20
+    templated: int = 5
+    methods: int = 10
+    params: int = 3
+    docs: int = 0
+
+    def asdict(self) -> dict:
+        return asdict(self)
+
+def declare(type: str, name: str) -> str:
+    return type + name if type[-1] in '*&' else f'{type} {name}'
+
+def doc(name: str, lines: int, indent: str) -> str:
+    """A doxygen block, quoting a declaration as documentation often does"""
+    if not lines:
+        return ''
+    result = f'{indent}/**\n{indent} * @brief Describes {name}.\n'
+    for i in range(lines - 1):
+        result += f'{indent} * Line {i}: call as `int {name}_example(int x);` for {{ "details" }}.\n'
+    return result + f'{indent} */\n'
+
+def function(name: str, n: int, params: int, tail: str, indent: str, docs: int = 0) -> str:
+    args = ', '.join(declare(TYPES[(n + i) % len(TYPES)], f'arg{i}') for i in range(params))
+    return doc(name, docs, indent) + f'{indent}{declare(RETURNS[n % len(RETURNS)], name)}({args}){tail};\n'
+
+def klass(n: int, shape: Shape, templated: bool, indent: str) -> str:
+    inner = indent + '    '
+    result = doc(f'Class{n}', shape.docs, indent)
+    result += indent + ('template <typename T, typename U>\n' + indent if templated else '')
+    result += f'class Class{n} : public Base {{\n{indent}public:\n'
+    result += f'{inner}Class{n}();\n{inner}~Class{n}();\n'
+    result += ''.join(function(f'method{m}', m, shape.params, TAILS[m % len(TAILS)], inner, shape.docs)
+                      for m in range(shape.methods))
+    result += f'\n{indent}private:\n{inner}int value_;\n{indent}}};\n\n'
+    return result
+
+def header(shape: Shape) -> str:
+    """A header with the given shape; classes are spread over the innermost namespaces"""
+    result = '#pragma once\n\n#include <map>\n#include <string>\n#include <vector>\n\n'
+    count = 0
+    for ns in range(shape.namespaces):
+        for d in range(shape.depth):
+            result += f'namespace ns{ns}_{d} {{\n\n'
+        indent = ''
+        share = shape.classes // shape.namespaces + (ns < shape.classes % shape.namespaces)
+        for _ in range(share):
+            result += klass(count, shape, count < shape.templated, indent)
+            count += 1
+        result += function(f'function{ns}', ns, shape.params, '', indent, shape.docs)
+        for d in reversed(range(shape.depth)):
+            result += f'\n}} // ns{ns}_{d}\n'
+        result += '\n'
+    return result
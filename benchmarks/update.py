@@ -0,0 +1,37 @@
+"""Times Tree.update against a full parse, checking that both give the same nodes.
+
+Run from the repository root: python -m benchmarks.update
+"""
+import time
+import cppgen.nodes as nodes
+from benchmarks.synth import Shape, header
+
+EDITS = [
+    ('insert', lambda fn: (fn.start, fn.start, 'void added(int x);\n')),
+    ('rename', lambda fn: (fn.start, fn.end, (fn.return_type or '') + ' renamed(' + fn.parameters + ');')),
+    ('delete', lambda fn: (fn.start, fn.end, '')),
+]
+
+def dump(tree: nodes.Tree) -> list:
+    return [(type(n).__name__, n.start, n.end, n.rel_name, n.parent.start if n.parent else None)
+            for n in tree.namespaces + tree.classes + tree.functions]
+
+def main():
+    source = header(Shape(namespaces=40, depth=3, classes=1000, templated=100, methods=20, params=4))
+    tree = nodes.Tree(source)
+    print(f'{len(source) / 1024:.1f} KiB header, {len(tree.functions)} functions')
+    print(f'{"edit":>8} {"at":>6} {"update ms":>10} {"parse ms":>10}')
+    for name, edit in EDITS:
+        for fraction in (0.1, 0.5, 0.9):
+            fn = tree.functions[int(len(tree.functions) * fraction)]
+            start = time.perf_counter()
+            tree.update(*edit(fn))
+            update = time.perf_counter() - start
+            start = time.perf_counter()
+            full = nodes.Tree(tree.source)
+            parse = time.perf_counter() - start
+            assert dump(tree) == dump(full), f'{name} at {fraction} differs from a full parse'
+            print(f'{name:>8} {fraction:>6} {update * 1000:>10.2f} {parse * 1000:>10.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import os
+from os import path
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping, NamedTuple, Optional, Union
+import cppgen.nodes as nodes
+from cppgen import stats
+from cppgen.stats import FileStats
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+
+@dataclass(frozen=True)
+class Options:
+    """The options of the command line that apply to one header"""
+    convention: str = 'default'
+    indent: str = 'convention'
+    tabsize: int = 0
+    todo: bool = True
+    cpp: str = '.cpp'
+    ipp: str = '.ipp'
+
+    @property
+    def conv(self) -> Convention:
+        return convention(self.convention, self.indent, self.tabsize, self.todo)
+
+class Result(NamedTuple):
+    """The definition file of a header: its name, whether it holds inline or
+    template definitions, and its source"""
+    filename: str
+    ipp: bool
+    source: str
+
+@lru_cache(maxsize=None)
+def convention(style: str, indent_style: str, tabsize_style: int, insert_todo: bool) -> Convention:
+    return Convention(style=style, indent_style=indent_style,
+                      tabsize_style=tabsize_style, insert_todo=insert_todo)
+
+def warm_up() -> None:
+    """Compiles the patterns up front, so the first header or request does not pay for them"""
+    for name in list(vars(nodes.Ptn)):
+        if not name.startswith('_'):
+            getattr(nodes.Ptn, name)
+
+def generate_one(name: str, source: Union[str, bytes], options: Options = Options()) -> Result:
+    """Generates the definitions of a header named `name`, which may be a path,
+    from its source, as text or UTF-8 bytes. The definition file name is next to it.
+    The stats of the header are passed to the hooks of cppgen.stats, if any."""
+    result, record = _generate(name, source, options, bool(stats.hooks))
+    if record is not None:
+        stats.emit(record)
+    return result
+
+def _generate(name: str, source: Union[str, bytes], options: Options,
+              record: bool) -> tuple[Result, Optional[FileStats]]:
+    if not record:
+        return _result(name, source, options), None
+    record = FileStats(name)
+    with stats.recording(record):
+        stats.count('bytes_in', len(source.encode() if isinstance(source, str) else source))
+        result = _result(name, source, options)
+        stats.count('bytes_out', len(result.source.encode()))
+    return result, record
+
+def _result(name: str, source: Union[str, bytes], options: Options) -> Result:
+    tree = nodes.Tree(source)
+    suffix = options.ipp if tree.need_ipp else options.cpp
+    with stats.phase('render'):
+        return Result(path.splitext(name)[0] + suffix, tree.need_ipp,
+                      generate(path.basename(name), options.conv, tree))
+
+def _generate_chunk(items: list[tuple[str, Union[str, bytes]]], options: Options,
+                    record: bool) -> list[tuple[Result, Optional[FileStats]]]:
+    return [_generate(name, source, options, record) for name, source in items]
+
+def generate_many(sources: Mapping[str, Union[str, bytes]], options: Options = Options(),
+                  jobs: int = 1, chunksize: Optional[int] = None) -> dict[str, Result]:
+    """Generates the definitions of headers given as names and sources, keeping their order.
+    With jobs other than 1, headers are split in chunks over that many worker
+    processes (0: the number of CPUs); each worker compiles its patterns once. The stats
+    of each header are passed to the hooks of cppgen.stats, in this process."""
+    items = list(sources.items())
+    jobs = jobs if jobs > 0 else os.cpu_count()
+    if jobs == 1 or len(items) < 2:
+        return {name: generate_one(name, source, options) for name, source in items}
+    from concurrent.futures import ProcessPoolExecutor
+    jobs = min(jobs, len(items))
+    chunksize = chunksize or max(1, len(items) // (jobs * 4))
+    chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+    result = {}
+    with ProcessPoolExecutor(jobs, initializer=warm_up) as pool:
+        record = bool(stats.hooks)
+        for chunk, outputs in zip(chunks, pool.map(_generate_chunk, chunks, [options] * len(chunks),
+                                                    [record] * len(chunks))):
+            for (name, _), (output, file_stats) in zip(chunk, outputs):
+                result[name] = output
+                if file_stats is not None:
+                    stats.emit(file_stats)
+    return result
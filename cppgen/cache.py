@@ -0,0 +1,100 @@
+import os, hashlib
+from os import path
+from mmap import mmap
+from typing import Iterable, Iterator, Optional, TextIO, Union
+
+# Bump when the output for the same header and options changes
+VERSION = 6
+MAX_SIZE = 64 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+def default_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or path.join(path.expanduser('~'), '.cache')
+    return path.join(base, 'cppgen')
+
+class Cache:
+    """On-disk cache of rendered definitions, keyed by header content and options"""
+    directory: str
+    max_size: int
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = MAX_SIZE):
+        self.directory = directory if directory is not None else default_dir()
+        self.max_size = max_size
+
+    def key(self, source: Union[str, bytes, mmap], *options) -> str:
+        digest = hashlib.sha256(repr((VERSION,) + options).encode())
+        digest.update(source.encode('utf-8', 'surrogatepass') if isinstance(source, str) else source)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[tuple[bool, Iterator[str]]]:
+        """Returns need_ipp and the output fragments for the key, if cached"""
+        filename = path.join(self.directory, key)
+        try:
+            f = open(filename, 'r', encoding='utf-8', newline='')
+            kind = f.readline()
+            if kind not in ('cpp\n', 'ipp\n'):
+                f.close()
+                return None
+            os.utime(filename)
+        except OSError:
+            return None
+        return kind == 'ipp\n', self._read(f)
+
+    def _read(self, f: TextIO) -> Iterator[str]:
+        with f:
+            yield from iter(lambda: f.read(CHUNK_SIZE), '')
+
+    def put(self, key: str, need_ipp: bool, output: str) -> None:
+        for _ in self.tee(key, need_ipp, [output]):
+            pass
+
+    def tee(self, key: str, need_ipp: bool, fragments: Iterable[str]) -> Iterator[str]:
+        """Yields the fragments while storing them as the entry for the key.
+        The entry is only stored if all fragments are consumed."""
+        import tempfile
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmpname = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+            f = os.fdopen(fd, 'w', encoding='utf-8', newline='')
+        except OSError:
+            yield from fragments
+            return
+        stored = True
+        try:
+            try:
+                f.write('ipp\n' if need_ipp else 'cpp\n')
+            except OSError:
+                stored = False
+            for fragment in fragments:
+                if stored:
+                    try:
+                        f.write(fragment)
+                    except OSError:
+                        stored = False
+                yield fragment
+            f.close()
+            if stored:
+                os.replace(tmpname, path.join(self.directory, key))
+        except OSError:
+            pass
+        finally:
+            f.close()
+            if path.exists(tmpname):
+                os.remove(tmpname)
+
+    def evict(self) -> None:
+        """Removes the least recently used entries beyond max_size"""
+        try:
+            entries = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                       for e in os.scandir(self.directory) if e.is_file()]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total -= size
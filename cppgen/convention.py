@@ -1,85 +1,95 @@
-import re, math
+import re
+from dataclasses import dataclass, field
 
-style = 'default'
-indent_style = 'convention'
-filename_style = 'snake_case'
-tabsize_style = 0
-insert_todo = True
+TYPE_SPACING = re.compile(r'(.+?)\s*([*&\s]+?)$')
 
-def block_start() -> str:
-    if style == 'gnu' or style == 'google':
-        return '\n{\n'
-    return ' {\n'
+@dataclass(frozen=True)
+class Convention:
+    """Coding convention settings, with the strings derived from them computed once"""
+    style: str = 'default'
+    indent_style: str = 'convention'
+    filename_style: str = 'snake_case'
+    tabsize_style: int = 0
+    insert_todo: bool = True
 
-def space_after_func_name() -> str:
-    if style == 'google':
-        return ''
-    return ' '
+    block_start: str = field(init=False, repr=False, compare=False)
+    space_after_func_name: str = field(init=False, repr=False, compare=False)
+    columns: int = field(init=False, repr=False, compare=False)
+    indent_char: str = field(init=False, repr=False, compare=False)
+    tabsize: int = field(init=False, repr=False, compare=False)
+    indent: str = field(init=False, repr=False, compare=False)
+    param_indent_style: str = field(init=False, repr=False, compare=False)
+    todo: str = field(init=False, repr=False, compare=False)
+    _type_spacing: dict[str, str] = field(init=False, repr=False, compare=False)
 
-def type_spacing(type: str) -> str:
-    if type.endswith('*') or type.endswith('&'):
-        if style == 'google':
-            return type + ' '
-        match = re.search(r'(.+?)\s*([*&\s]+?)$', type)
-        name = match.group(1)
-        pt = match.group(2)
-        if style == 'gnu':
-            return name + ' ' + pt + '\n'
-        return name + ' ' + pt
-    if style == 'gnu':
-        return type + '\n'
-    return type + ' '
+    def __post_init__(self):
+        gnu_like = self.style == 'gnu' or self.style == 'google'
+        derived = {}
+        derived['block_start'] = '\n{\n' if gnu_like else ' {\n'
+        derived['space_after_func_name'] = '' if self.style == 'google' else ' '
+        derived['columns'] = 78
+        if self.indent_style != 'convention':
+            derived['indent_char'] = ' ' if self.indent_style == 'space' else '\t'
+        else:
+            derived['indent_char'] = ' '
+        if self.tabsize_style != 0:
+            derived['tabsize'] = self.tabsize_style
+        else:
+            derived['tabsize'] = 2 if gnu_like else 4
+        ch = derived['indent_char']
+        derived['indent'] = ch * derived['tabsize'] if ch == ' ' else ch
+        derived['param_indent_style'] = 'double_indent' if gnu_like else 'vert_align'
+        derived['todo'] = derived['indent'] + '// TODO\n' if self.insert_todo else ''
+        derived['_type_spacing'] = {}
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
 
-def columns() -> int:
-    return 78
+    def type_spacing(self, type: str) -> str:
+        result = self._type_spacing.get(type)
+        if result is None:
+            result = self._type_spacing[type] = self._compute_type_spacing(type)
+        return result
 
-def indent_char() -> str:
-    if indent_style != 'convention':
-        return ' ' if indent_style == 'space' else '\t'
-    if style == 'gnu' or style == 'google':
-        return ' '
-    return ' '
+    def _compute_type_spacing(self, type: str) -> str:
+        if type.endswith('*') or type.endswith('&'):
+            if self.style == 'google':
+                return type + ' '
+            match = TYPE_SPACING.search(type)
+            name = match.group(1)
+            pt = match.group(2)
+            if self.style == 'gnu':
+                return name + ' ' + pt + '\n'
+            return name + ' ' + pt
+        if self.style == 'gnu':
+            return type + '\n'
+        return type + ' '
 
-def indent() -> str:
-    ch = indent_char()
-    return ch * tabsize() if ch == ' ' else ch
+    def spaces_to_indent(self, spaces: str) -> str:
+        if self.indent_char == ' ':
+            return spaces
+        else:
+            num = len(spaces) / self.tabsize
+            return '\t' * int(round(num))
 
-def tabsize() -> int:
-    if tabsize_style != 0:
-        return tabsize_style
-    if style == 'gnu' or style == 'google':
-        return 2
-    return 4
+    def convert_case(self, text: str) -> str:
+        if self.filename_style == 'snake_case':
+            return snakecase(text)
+        elif self.filename_style == 'hyphen-case':
+            return snakecase(text).replace('_', '-')
+        elif self.filename_style == 'lowercase':
+            return snakecase(text).replace('_', '')
+        elif self.filename_style == 'UPPERCASE':
+            return snakecase(text).replace('_', '').upper()
+        elif self.filename_style == 'camelCase':
+            return camelcase(text)
+        elif self.filename_style == 'PascalCase':
+            return pascalcase(text)
+        elif self.filename_style == 'CONST_CASE':
+            return snakecase(text).upper()
+        else:
+            raise ValueError(f'Invalid filename style: {self.filename_style}')
 
-def spaces_to_indent(spaces: str) -> str:
-    if indent_char() == ' ':
-        return spaces
-    else:
-        num = len(spaces) / tabsize()
-        return '\t' * int(round(num))
-
-def param_indent_style() -> str:
-    if style == 'gnu' or style == 'google':
-        return 'double_indent'
-    return 'vert_align'
-
-def convert_case(text: str) -> str:
-    if filename_style == 'snake_case':
-        return snakecase(text)
-    elif filename_style == 'hyphen-case':
-        return snakecase(text).replace('_', '-')
-    elif filename_style == 'lowercase':
-        return snakecase(text).replace('_', '')
-    elif filename_style == 'UPPERCASE':
-        return snakecase(text).replace('_', '').upper()
-    elif filename_style == 'camelCase':
-        return camelcase(text)
-    elif filename_style == 'PascalCase':
-        return pascalcase(text)
-    elif filename_style == 'CONST_CASE':
-        return snakecase(text).upper()
-    else:
-        raise 'Invalid filename style'
+DEFAULT = Convention()
 
 def snakecase(text: str) -> str:
     text = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', text)
@@ -1,13 +1,28 @@
 import sys, os, argparse
 from os import path
+from collections import deque
+from contextlib import nullcontext
+from mmap import mmap, ACCESS_READ
+from typing import Container, Iterable, Iterator, NamedTuple, Optional, Union
 import cppgen.nodes as nodes
-import cppgen.convention as convention
-from cppgen.utils import query_yn
+from cppgen import stats
+from cppgen.stats import FileStats
+from cppgen.convention import Convention
+from cppgen.cache import Cache
+from cppgen.discover import HEADER_PATTERNS, find
+from cppgen.index import DEFINITION_PATTERNS, Index, default_filename
+from cppgen.symbols import Definitions, normalize_name, signature
+from cppgen.utils import query_yn, write_atomic
+
+# Headers from this size on are read as a memory map
+MMAP_SIZE = 1024 * 1024
+# Headers from this size on are parsed in shards over the worker processes
+SHARDED_SIZE = 1024 * 1024
 
 def arg_parser():
     parser = argparse.ArgumentParser(description='Generate definitions from headers')
-    parser.add_argument('files', metavar='FILE', type=str, nargs='+',
-                        help='A header file')
+    parser.add_argument('files', metavar='FILE', type=str, nargs='*',
+                        help='A header file, or a directory to search for headers')
     parser.add_argument('--cpp', action='store', type=str, default='.cpp',
                         help='Suffix for files containing function definitions (default: .cpp)')
     parser.add_argument('--ipp', action='store', type=str, default='.ipp',
@@ -20,53 +35,296 @@ def arg_parser():
                         help='Specify tab size (default: 0; follow convention)')
     parser.add_argument('--no-todo', action='store_true',
                         help='Do not insert todo comments')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes (default: 1; 0: number of CPUs)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Do not use the cache of previously generated definitions')
+    parser.add_argument('--merge', action='store_true',
+                        help='Append missing definitions to existing definition files instead of overwriting them')
+    parser.add_argument('--include', metavar='GLOB', action='append',
+                        help=f'Headers to search for in directories (default: {" ".join(HEADER_PATTERNS)})')
+    parser.add_argument('--exclude', metavar='GLOB', action='append',
+                        help='Files and directories to skip in directories')
+    parser.add_argument('--gitignore', action='store_true',
+                        help='Skip files ignored by .gitignore files in directories')
+    parser.add_argument('--serve', metavar='SOCKET', nargs='?', const='-',
+                        help='Serve JSON-lines requests on stdin, or on a Unix socket, instead of processing files')
+    parser.add_argument('--watch', metavar='DIR', action='append',
+                        help='Keep running and regenerate definitions as headers in the directory change')
+    parser.add_argument('--index', metavar='DIR', action='append',
+                        help='Skip declarations defined in other definition files in the directory, '
+                             'which are indexed across runs')
+    parser.add_argument('--stats', action='store_true',
+                        help='Report time per phase and counts for each header on stderr')
+    parser.add_argument('--stats-format', choices=['table', 'json'], default='table',
+                        help='Format of the report of --stats (default: table)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='Write cProfile statistics of the run to FILE, for pstats or snakeviz')
     return parser
 
-def generate(header_name: str, args: argparse.Namespace, tree: nodes.Tree) -> str:
-    result = ''
+def convention_of(args: argparse.Namespace) -> Convention:
+    return Convention(style=args.convention, indent_style=args.indent,
+                      tabsize_style=args.tabsize, insert_todo=not args.no_todo)
+
+def render(header_name: str, conv: Convention, tree: nodes.Tree, skip: Container[nodes.Func] = ()) -> Iterator[str]:
+    """Yields the definition file source, one namespace boundary or function at a time.
+    Functions in skip are left out."""
     if not tree.need_ipp:
-        result += f'#include "{header_name}"\n\n'
+        yield f'#include "{header_name}"\n\n'
 
     # Global namespace
-    functions = tree.get_functions_for(None)
+    for fn in tree.get_functions_for(None):
+        if fn not in skip:
+            yield fn.repr(conv) + '\n\n'
+
+    for i, ns in enumerate(tree.root_namespaces):
+        yield ('\n\n\n' if i else '') + ns.repr_start(conv)
+        for j, fn in enumerate(fn for fn in tree.get_functions_for(ns) if fn not in skip):
+            yield ('\n\n' if j else '') + fn.repr(conv)
+        yield ns.repr_end
+    yield '\n'
+
+def generate(header_name: str, conv: Convention, tree: nodes.Tree, skip: Container[nodes.Func] = ()) -> str:
+    return ''.join(render(header_name, conv, tree, skip))
+
+def merge(source: str, conv: Convention, tree: nodes.Tree, skip: Container[nodes.Func] = ()) -> tuple[str, int]:
+    """Inserts the definitions missing from an existing definition file, except
+    functions in skip. Returns the new source and the number of inserted definitions."""
+    defs = Definitions(source)
+    count = 0
+    inserts = []
+    appended = ''
+
+    functions = [fn for fn in tree.get_functions_for(None) if fn not in skip and signature(fn) not in defs]
     if functions:
-        result += '\n\n'.join(fn.repr for fn in functions)
-        result += '\n\n'
-
-    ns_results = []
-    root_namespaces = tree.root_namespaces
-    for ns in root_namespaces:
-        text = ns.repr_start
-        functions = tree.get_functions_for(ns)
-        text += '\n\n'.join(fn.repr for fn in functions)
-        text += ns.repr_end
-        ns_results.append(text)
-    result += '\n\n\n'.join(ns_results) + '\n'
-    return result
+        count += len(functions)
+        appended += '\n\n' + '\n\n'.join(fn.repr(conv) for fn in functions)
+
+    for ns in tree.root_namespaces:
+        functions = [fn for fn in tree.get_functions_for(ns) if fn not in skip and signature(fn) not in defs]
+        if not functions:
+            continue
+        count += len(functions)
+        text = '\n\n'.join(fn.repr(conv) for fn in functions)
+        close = defs.namespaces.get(normalize_name(ns.name))
+        if close is not None:
+            inserts.append((len(source[:close].rstrip()), '\n\n' + text))
+        else:
+            appended += '\n\n\n' + ns.repr_start(conv) + text + ns.repr_end
+
+    if not count:
+        return source, 0
+    result = ''
+    pos = 0
+    for offset, text in sorted(inserts):
+        result += source[pos:offset] + text
+        pos = offset
+    result += source[pos:]
+    if appended:
+        result = result.rstrip() + appended + '\n'
+    return result, count
+
+def candidates(filename: str, args: argparse.Namespace) -> list[str]:
+    """The possible definition files of a header"""
+    basepath = os.path.splitext(filename)[0]
+    return [basepath + args.cpp, basepath + args.ipp]
+
+class Output(NamedTuple):
+    filename: str
+    source: Iterable[str]
+    merged: Optional[int] = None
+    stats: Optional[FileStats] = None
+
+def read(filename: str) -> Union[str, mmap]:
+    """The text of a header, or a memory map of its bytes if it is large. Trees
+    parse the map in place, so that large headers are never held decoded."""
+    with open(filename, 'r') as f:
+        size = os.fstat(f.fileno()).st_size
+        stats.count('bytes_in', size)
+        if size < MMAP_SIZE:
+            return f.read()
+        return mmap(f.fileno(), 0, access=ACCESS_READ)
+
+def process(filename: str, args: argparse.Namespace, conv: Convention, cache: Optional[Cache] = None,
+            jobs: int = 1, index: Optional[Index] = None) -> Output:
+    """Returns the definition file name and its source fragments for a header.
+    Fragments are rendered lazily, as the output is written. With jobs other
+    than 1, the header is parsed in shards by that many worker processes. With
+    an index, functions defined in other files of the index are left out."""
+    with stats.phase('read'):
+        source = read(filename)
+    header_name = path.basename(filename)
+    basepath = os.path.splitext(filename)[0]
+    if args.merge and any(path.exists(c) for c in candidates(filename, args)) or index is not None:
+        cache = None
+    if cache is not None:
+        key = cache.key(source, header_name, args.cpp, args.ipp, conv)
+        entry = cache.get(key)
+        if entry is not None:
+            stats.count('cache_hits')
+            need_ipp, fragments = entry
+            return Output(basepath + (args.ipp if need_ipp else args.cpp), fragments)
+    tree = nodes.Tree(source, jobs)
+    new_filename = basepath + (args.ipp if tree.need_ipp else args.cpp)
+    skip = set()
+    if index is not None:
+        # Definitions in the file about to be overwritten would be lost
+        defined = index if args.merge else index.elsewhere(new_filename)
+        skip = {fn for fn in tree.functions if signature(fn) in defined}
+    if args.merge and path.exists(new_filename):
+        with open(new_filename, 'r') as f, stats.phase('render'):
+            newsrc, merged = merge(f.read(), conv, tree, skip)
+        return Output(new_filename, [newsrc], merged)
+    if skip and len(skip) == len(tree.functions):
+        return Output(new_filename, [], 0)
+    fragments = render(header_name, conv, tree, skip)
+    if cache is not None:
+        fragments = cache.tee(key, tree.need_ipp, fragments)
+    if stats.active() is not None:
+        # Render up front, so that rendering and writing are timed apart
+        with stats.phase('render'):
+            fragments = list(fragments)
+    return Output(new_filename, fragments)
+
+def try_process(filename: str, args: argparse.Namespace, conv: Convention, cache: Optional[Cache],
+                join: bool = False, jobs: int = 1, index: Optional[Index] = None,
+                record: bool = False) -> tuple[Optional[Output], Optional[str]]:
+    """Processes a header, catching its errors; join renders the whole output up front.
+    With record, the output carries the timings and counts of the header."""
+    record = FileStats(filename) if record else None
+    try:
+        with stats.recording(record) if record is not None else nullcontext():
+            output = process(filename, args, conv, cache, jobs, index)
+            if join:
+                output = output._replace(source=[''.join(output.source)])
+        return output._replace(stats=record), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+def is_large(filename: str) -> bool:
+    try:
+        return path.getsize(filename) >= SHARDED_SIZE
+    except OSError:
+        return False
+
+def process_all(filenames: Iterable[str], args: argparse.Namespace, conv: Convention, cache: Optional[Cache],
+                index: Optional[Index] = None, record: bool = False) -> Iterator[tuple[str, Optional[Output], Optional[str]]]:
+    """Processes headers, in parallel if requested; results keep the input order.
+    Only a bounded number of headers is read ahead of the consumer. A large header
+    is parsed in shards instead, so that it does not hold up a single worker."""
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    if jobs == 1:
+        for filename in filenames:
+            yield (filename, *try_process(filename, args, conv, cache, index=index, record=record))
+        return
+    from concurrent.futures import Future, ProcessPoolExecutor
+    with ProcessPoolExecutor(jobs) as pool:
+        pending = deque()
+        for filename in filenames:
+            if is_large(filename):
+                future = Future()
+                future.set_result(try_process(filename, args, conv, cache, jobs=jobs, index=index, record=record))
+            else:
+                future = pool.submit(try_process, filename, args, conv, cache, True, index=index, record=record)
+            pending.append((filename, future))
+            if len(pending) >= jobs * 2:
+                filename, future = pending.popleft()
+                yield (filename, *future.result())
+        while pending:
+            filename, future = pending.popleft()
+            yield (filename, *future.result())
 
 def main():
     argparser = arg_parser()
     args = argparser.parse_args()
-    convention.style = args.convention
-    convention.indent_style = args.indent
-    convention.tabsize_style = args.tabsize
-    convention.insert_todo = not args.no_todo
-    for filename in args.files:
-        if filename.endswith(args.cpp) or filename.endswith(args.ipp):
-            print(f'Skip: {filename} (definition file)')
-            continue
-        with open(filename, 'r') as f:
-            source = f.read()
-            tree = nodes.Tree(source)
-            basepath = os.path.splitext(filename)[0]
-            new_filename = basepath + (args.ipp if tree.need_ipp else args.cpp)
-            if path.exists(new_filename):
-                res = query_yn(f"Overwrite?: {new_filename}")
-                if not res:
-                    print(f'Skip: {filename} (definition already exists)')
-                    continue
-            newsrc = generate(path.basename(filename), args, tree)
-            with open(new_filename, 'w') as w:
-                w.write(newsrc)
-            print(f'Generate: {filename} -> {new_filename}')
+    if args.serve is not None:
+        if args.files or args.watch or args.index:
+            argparser.error('FILE, --watch and --index cannot be used with --serve')
+        from cppgen.api import Options
+        from cppgen.server import serve
+        serve(args.serve, Options(args.convention, args.indent, args.tabsize, not args.no_todo, args.cpp, args.ipp))
+        return
+    conv = convention_of(args)
+    cache = None if args.no_cache else Cache()
+    if args.watch:
+        if args.files or args.index:
+            argparser.error('FILE and --index cannot be used with --watch')
+        from cppgen.watch import watch
+        watch(args.watch, args, conv, cache)
+        return
+    if not args.files:
+        argparser.error('the following arguments are required: FILE')
+    if args.profile and args.jobs != 1:
+        argparser.error('--profile cannot be used with worker processes (-j)')
+    # Hooks registered by a build tool running main() receive the stats even without --stats
+    report = stats.Report() if args.stats or stats.hooks else None
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    index = None
+    if args.index:
+        index = Index(default_filename(args.index))
+        patterns = DEFINITION_PATTERNS + [p for p in ('*' + args.cpp, '*' + args.ipp) if p not in DEFINITION_PATTERNS]
+        if index.update(args.index, patterns, args.exclude, args.gitignore):
+            index.save()
+    try:
+        failures = process_files(args, conv, cache, report, index)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+    if args.stats:
+        report.write(args.stats_format)
+    if failures:
+        print(f'Failed: {len(failures)} file(s)')
+        sys.exit(1)
+
+def process_files(args: argparse.Namespace, conv: Convention, cache: Optional[Cache],
+                  report: Optional[stats.Report], index: Optional[Index] = None) -> list[str]:
+    """Generates the definitions of the headers given on the command line.
+    Returns the headers that failed."""
+    overwrite = {}
 
+    def headers() -> Iterator[str]:
+        for filename in find(args.files, args.include, args.exclude, args.gitignore):
+            if filename.endswith(args.cpp) or filename.endswith(args.ipp):
+                print(f'Skip: {filename} (definition file)')
+                continue
+            # Settle overwrites before processing, as workers cannot prompt
+            for candidate in candidates(filename, args) if not args.merge else []:
+                if candidate not in overwrite and path.exists(candidate):
+                    overwrite[candidate] = query_yn(f"Overwrite?: {candidate}")
+            yield filename
+
+    failures = []
+    for filename, result, error in process_all(headers(), args, conv, cache, index, report is not None):
+        if error is not None:
+            print(f'Error: {filename} ({error})')
+            failures.append(filename)
+            continue
+        new_filename, fragments, merged, record = result
+        if not overwrite.get(new_filename, True):
+            print(f'Skip: {filename} (definition already exists)')
+        elif merged == 0:
+            print(f'Skip: {filename} (definitions up to date)')
+        else:
+            try:
+                with stats.recording(record) if record is not None else nullcontext():
+                    with stats.phase('write'):
+                        write_atomic(new_filename, fragments)
+                    stats.count('bytes_out', path.getsize(new_filename))
+            except Exception as e:
+                print(f'Error: {filename} ({type(e).__name__}: {e})')
+                failures.append(filename)
+                continue
+            if merged is not None:
+                print(f'Merge: {filename} -> {new_filename} ({merged} new)')
+            else:
+                print(f'Generate: {filename} -> {new_filename}')
+        if report is not None:
+            report.add(record)
+    if cache is not None:
+        cache.evict()
+    return failures
@@ -0,0 +1,237 @@
+from __future__ import annotations
+from typing import NamedTuple, Optional
+import re
+
+# Every alternative is a fixed set of characters or a plain run, so tokenizing is linear
+TOKEN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|[0-9][A-Za-z0-9_.\']*|::|->|\.\.\.|&&|\S')
+
+HEAD_SPECIFIERS = {'static', 'inline', 'virtual', 'explicit', 'constexpr', 'consteval', 'constinit',
+                   'extern', '_Noreturn', 'friend'}
+# Specifiers that are repeated on a definition outside the class
+DEFINITION_SPECIFIERS = ('inline', 'constexpr', 'consteval')
+DROPPED_TAIL = {'override', 'final'}
+ATTRIBUTES = {'__attribute__', '__declspec', 'alignas'}
+NOT_DECLARATIONS = {'typedef', 'using', 'friend', 'return', 'static_assert', 'namespace', 'enum',
+                    'class', 'struct', 'union', 'if', 'else', 'for', 'while', 'do', 'switch', 'case',
+                    'goto', 'throw', 'delete', 'new', 'co_return', 'co_yield', 'co_await', 'break',
+                    'continue', 'default', 'asm'}
+NOT_NAMES = {'decltype', 'sizeof', 'alignof', 'noexcept', 'typeid', 'throw', 'return', 'if', 'while',
+             'for', 'switch', 'catch'} | ATTRIBUTES
+CLOSING = {'(': ')', '[': ']', '<': '>', '{': '}'}
+CLOSERS = set(CLOSING.values())
+# Tokens that end or interrupt the return type and name
+HEAD_DELIMITERS = HEAD_SPECIFIERS | ATTRIBUTES | {'operator', '(', '<', '[', '{', ')', ']', '}', ';', '='}
+# Tokens that need more than copying into the tail specifiers
+TAIL_DELIMITERS = DROPPED_TAIL | ATTRIBUTES | {'=', '[', '(', '<', '{'}
+PARAM_DELIMITER = re.compile(r'[,<>()\[\]{}=]')
+# Spaces dropped when joining tokens with one space each: after opening brackets and
+# '::', before closing ones, within template names, and between '*' or '&' and a name.
+# A '(' is spaced from a name only when it opens a declarator like `void (*fn)(int)`.
+SPACE = re.compile(r''' (?:(?<=[(\[<~"'] )|(?<=:: )|(?=[)\]>,\["']|::|\.\.\.)|(?<=[\w>)] )(?=<)'''
+                   r'''|(?<!\w )(?=\()|(?<=\w )(?=\((?! (?:[*^]|&(?!&))))|(?<=[*&] )(?=[\w*&()]))''')
+
+class Declaration(NamedTuple):
+    template_params: Optional[str]
+    head_specifiers: Optional[str]
+    return_type: Optional[str]
+    name: str
+    parameters: str
+    tail_specifiers: Optional[str]
+
+def is_word(token: str) -> bool:
+    return token[0].isalnum() or token[0] == '_'
+
+def join(tokens: list[str]) -> str:
+    """The tokens of a type or declaration in the conventional spacing"""
+    if len(tokens) < 2:
+        return tokens[0] if tokens else ''
+    return SPACE.sub('', ' '.join(tokens))
+
+def closing(tokens: list[str], i: int) -> int:
+    """The index of the bracket closing tokens[i], or len(tokens) if unclosed.
+    '<' and '>' only nest directly in angle brackets, as they may be operators in others."""
+    stack = [tokens[i]]
+    for j in range(i + 1, len(tokens)):
+        tok = tokens[j]
+        if tok in CLOSING:
+            if tok != '<' or stack[-1] == '<':
+                stack.append(tok)
+        elif tok in CLOSERS:
+            if tok != CLOSING[stack[-1]]:
+                if tok == '>':
+                    continue
+                # Angle brackets left open were operators after all
+                while stack and stack[-1] == '<':
+                    stack.pop()
+                if not stack or tok != CLOSING[stack[-1]]:
+                    return len(tokens)
+            stack.pop()
+            if not stack:
+                return j
+    return len(tokens)
+
+def split_params(parameters: str) -> list[str]:
+    """Splits a joined parameter list at top-level commas, dropping default arguments"""
+    result = []
+    start = 0
+    depth = 0
+    default = None
+    for match in PARAM_DELIMITER.finditer(parameters):
+        delimiter = match.group()
+        if delimiter == ',' and depth == 0:
+            result.append(parameters[start:match.start() if default is None else default].strip())
+            start = match.end()
+            default = None
+        elif delimiter in '([{' or delimiter == '<' and default is None:
+            depth += 1
+        elif delimiter in ')]}' or delimiter == '>' and default is None:
+            depth = max(depth - 1, 0)
+        elif delimiter == '=' and depth == 0 and default is None:
+            default = match.start()
+    result.append(parameters[start:len(parameters) if default is None else default].strip())
+    return [param for param in result if param]
+
+def operator_name(tokens: list[str], i: int) -> tuple[str, int]:
+    """The name of the operator function at tokens[i] and the index of its parameter list"""
+    j = i + 1
+    if tokens[j:j + 2] == ['(', ')']:
+        return 'operator()', j + 2
+    while j < len(tokens) and tokens[j] != '(':
+        j += 1
+    symbol = tokens[i + 1:j]
+    if symbol and is_word(symbol[0]):
+        return 'operator ' + join(symbol), j
+    return 'operator' + ''.join(symbol), j
+
+def parse(tokens: list[str]) -> Optional[tuple[int, Declaration]]:
+    """Parses a function declaration, given the tokens of a statement without its ';'.
+    Returns the index of its first token and the declaration, or None if it is not one."""
+    i = 0
+    # Access labels
+    while ':' in tokens:
+        j = i
+        while j < len(tokens) and is_word(tokens[j]):
+            j += 1
+        if j > i and j < len(tokens) and tokens[j] == ':':
+            i = j + 1
+        else:
+            break
+    if i >= len(tokens) or tokens[i] in NOT_DECLARATIONS:
+        return None
+    first = i
+
+    templates = []
+    while i + 1 < len(tokens) and tokens[i] == 'template' and tokens[i + 1] == '<':
+        end = closing(tokens, i + 1)
+        templates.append(join(tokens[i + 1:end + 1]))
+        i = end + 1
+
+    # Find the parameter list: the first '(' after a name, outside brackets
+    try:
+        paren = tokens.index('(', i)
+    except ValueError:
+        return None
+    head = tokens[i:paren]
+    specifiers = []
+    name = None
+    if not HEAD_DELIMITERS.isdisjoint(head):
+        # Specifiers, attributes, operators or template arguments
+        head = []
+        paren = None
+    elif not head or not is_word(head[-1]) or head[-1] in NOT_NAMES:
+        return None
+    while paren is None and i < len(tokens):
+        tok = tokens[i]
+        if tok not in HEAD_DELIMITERS:
+            head.append(tok)
+            i += 1
+        elif tok in HEAD_SPECIFIERS:
+            if tok == 'friend':
+                return None
+            specifiers.append(tok)
+            if tok == 'extern' and tokens[i + 1:i + 3] == ['"', '"']:
+                i += 2
+            i += 1
+        elif tok in ATTRIBUTES and i + 1 < len(tokens) and tokens[i + 1] == '(':
+            i = closing(tokens, i + 1) + 1
+        elif tok == '[' and i + 1 < len(tokens) and tokens[i + 1] == '[':
+            i = closing(tokens, i) + 1
+        elif tok == 'operator':
+            name, paren = operator_name(tokens, i)
+            break
+        elif tok == '(':
+            if head and is_word(head[-1]) and head[-1] not in NOT_NAMES:
+                paren = i
+                break
+            return None
+        elif tok == '<':
+            end = closing(tokens, i)
+            head.extend(tokens[i:end + 1])
+            i = end + 1
+        else:
+            return None
+    if paren is None or paren >= len(tokens):
+        return None
+
+    # The name, possibly qualified, ends the head
+    if name is None:
+        n = len(head) - 1
+        if n > 0 and head[n - 1] == '~':
+            n -= 1
+        while n >= 2 and head[n - 1] == '::':
+            n -= 2
+            if head[n] == '>':
+                depth = 0
+                while n >= 0:
+                    depth += {'>': 1, '<': -1}.get(head[n], 0)
+                    if depth == 0:
+                        break
+                    n -= 1
+                n -= 1
+            if n < 0 or not is_word(head[n]):
+                return None
+        name = join(head[n:])
+        head = head[:n]
+    elif head and head[-1] == '::':
+        return None
+    if head and not is_word(head[0]) and not any(is_word(tok) for tok in head):
+        return None
+
+    close = tokens.index(')', paren) if ')' in tokens[paren:] else len(tokens)
+    if '(' in tokens[paren + 1:close]:
+        close = closing(tokens, paren)
+    if close >= len(tokens):
+        return None
+    parameters = join(tokens[paren + 1:close])
+
+    tail = tokens[close + 1:]
+    i = len(tokens)
+    if not TAIL_DELIMITERS.isdisjoint(tail):
+        tail = []
+        i = close + 1
+    while i < len(tokens):
+        tok = tokens[i]
+        if tok == '=':
+            # Pure virtual, defaulted and deleted functions need no definition
+            return None
+        if tok in DROPPED_TAIL:
+            i += 1
+        elif tok in ATTRIBUTES and i + 1 < len(tokens) and tokens[i + 1] == '(':
+            i = closing(tokens, i + 1) + 1
+        elif tok == '[' and i + 1 < len(tokens) and tokens[i + 1] == '[':
+            i = closing(tokens, i) + 1
+        elif tok in CLOSING:
+            end = closing(tokens, i)
+            tail.extend(tokens[i:end + 1])
+            i = end + 1
+        else:
+            tail.append(tok)
+            i += 1
+
+    return first, Declaration(
+        '\ntemplate '.join(templates) or None,
+        ' '.join(specifiers) or None,
+        join(head) or None,
+        name,
+        parameters,
+        join(tail) or None)
@@ -0,0 +1,162 @@
+import os, re
+from os import path
+from fnmatch import fnmatch
+from typing import Iterable, Iterator, Optional
+
+HEADER_PATTERNS = ['*.h', '*.hh', '*.hpp', '*.hxx', '*.h++']
+
+def glob_regex(pattern: str) -> str:
+    """Translates a glob with gitignore-style `**` into a regex over '/'-separated paths"""
+    result = ''
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            result += '(?:.*/)?'
+            i += 3
+        elif pattern.startswith('**', i):
+            result += '.*'
+            i += 2
+        elif pattern[i] == '*':
+            result += '[^/]*'
+            i += 1
+        elif pattern[i] == '?':
+            result += '[^/]'
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            result += '[' + pattern[i + 1:end].replace('!', '^', 1) + ']'
+            i = end + 1
+        else:
+            result += re.escape(pattern[i])
+            i += 1
+    return result
+
+class IgnoreRule:
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+    anchored: bool
+
+    def __init__(self, line: str):
+        self.negate = line.startswith('!')
+        if self.negate:
+            line = line[1:]
+        self.dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        self.anchored = '/' in line
+        self.regex = re.compile(glob_regex(line.lstrip('/')) + r'\Z')
+
+    def match(self, relpath: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        target = relpath if self.anchored else relpath.rsplit('/', 1)[-1]
+        return self.regex.match(target) is not None
+
+class GitIgnore:
+    """The rules of a .gitignore file, relative to its directory"""
+    directory: str
+    rules: list[IgnoreRule]
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.rules = []
+        try:
+            with open(path.join(directory, '.gitignore'), 'r') as f:
+                for line in f:
+                    line = line.rstrip('\n').rstrip()
+                    if line and not line.startswith('#'):
+                        self.rules.append(IgnoreRule(line))
+        except OSError:
+            pass
+
+    def match(self, filename: str, is_dir: bool) -> Optional[bool]:
+        """Whether the file is ignored, or None if no rule applies"""
+        relpath = path.relpath(filename, self.directory).replace(os.sep, '/')
+        result = None
+        for rule in self.rules:
+            if rule.match(relpath, is_dir):
+                result = not rule.negate
+        return result
+
+def is_ignored(ignores: list[GitIgnore], filename: str, is_dir: bool) -> bool:
+    for ignore in reversed(ignores):
+        result = ignore.match(filename, is_dir)
+        if result is not None:
+            return result
+    return False
+
+def matches(patterns: list[str], filename: str, root: str) -> bool:
+    relpath = path.relpath(filename, root).replace(os.sep, '/')
+    for pattern in patterns:
+        target = relpath if '/' in pattern else path.basename(filename)
+        if re.match(glob_regex(pattern) + r'\Z', target) if '**' in pattern else fnmatch(target, pattern):
+            return True
+    return False
+
+def walk(root: str, include: list[str], exclude: list[str], gitignore: bool) -> Iterator[str]:
+    """Lazily yields the files under a directory, in sorted order. Symbolic links
+    to directories are followed, but each directory is only searched once."""
+    stack = [(root, [GitIgnore(root)] if gitignore else [])]
+    visited = set()
+    while stack:
+        directory, ignores = stack.pop()
+        try:
+            st = os.stat(directory)
+            if (st.st_dev, st.st_ino) in visited:
+                continue
+            visited.add((st.st_dev, st.st_ino))
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+                is_file = not is_dir and entry.is_file()
+            except OSError:
+                continue  # A broken or looping symbolic link
+            if gitignore and (entry.name == '.git' or is_ignored(ignores, entry.path, is_dir)):
+                continue
+            if matches(exclude, entry.path, root):
+                continue
+            if is_dir:
+                subdirs.append(entry.path)
+            elif is_file and matches(include, entry.path, root):
+                yield entry.path
+        for subdir in reversed(subdirs):
+            stack.append((subdir, ignores + [GitIgnore(subdir)] if gitignore else []))
+
+def find(paths: Iterable[str], include: Optional[list[str]] = None,
+         exclude: Optional[list[str]] = None, gitignore: bool = False) -> Iterator[str]:
+    """Yields the given files and the matching files under the given directories"""
+    include = include or HEADER_PATTERNS
+    exclude = exclude or []
+    for filename in paths:
+        if path.isdir(filename):
+            yield from walk(filename, include, exclude, gitignore)
+        else:
+            yield filename
+
+def selected(root: str, filename: str, include: Optional[list[str]] = None,
+             exclude: Optional[list[str]] = None, gitignore: bool = False) -> bool:
+    """Whether find would yield the file when searching the root directory"""
+    include = include or HEADER_PATTERNS
+    exclude = exclude or []
+    if not matches(include, filename, root):
+        return False
+    parts = path.relpath(filename, root).split(os.sep)
+    if parts[0] == os.pardir:
+        return False
+    ignores = []
+    current = root
+    for i, part in enumerate(parts):
+        if gitignore:
+            ignores.append(GitIgnore(current))
+        current = path.join(current, part)
+        is_dir = i < len(parts) - 1
+        if gitignore and (part == '.git' or is_ignored(ignores, current, is_dir)):
+            return False
+        if matches(exclude, current, root):
+            return False
+    return True
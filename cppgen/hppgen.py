@@ -1,15 +1,20 @@
-import os, argparse
+import sys, csv, json, argparse
 from os import path
 from pathlib import Path
+from typing import NamedTuple
 import cppgen.convention as convention
-from cppgen.utils import query_yn
+from cppgen.convention import Convention
+from cppgen.utils import query_yn, write_atomic
+
+TYPES = ['class', 'struct', 'enum']
+# Types whose headers declare no functions, so have nothing for cppgen to define
+NO_FUNCTIONS = {'enum'}
 
 def arg_parser():
     parser = argparse.ArgumentParser(description='Generate a header')
-    parser.add_argument('type', metavar='TYPE', nargs='?', default='class',
-                        choices=['class', 'struct', 'enum'],
+    parser.add_argument('type', metavar='TYPE', nargs='?',
                         help='Type: class, struct, or enum (default: class)')
-    parser.add_argument('name', metavar='NAME', type=str, nargs=1,
+    parser.add_argument('name', metavar='NAME', type=str, nargs='?',
                         help='(<NAMESPACE>::)*<NAME>')
     parser.add_argument('--suffix', action='store', type=str, default='.hpp',
                         help='Suffix for the generated header file (default: .hpp)')
@@ -22,27 +27,84 @@ def arg_parser():
                         help='Specify indentation character (default: follow convention)')
     parser.add_argument('-t', '--tabsize', type=int, default=0,
                         help='Specify tab size (default: 0; follow convention)')
+    parser.add_argument('--manifest', metavar='FILE',
+                        help='Generate the headers listed in a JSON or CSV file ("-": stdin) instead of NAME')
+    existing = parser.add_mutually_exclusive_group()
+    existing.add_argument('--force', action='store_true',
+                          help='Overwrite existing files without asking')
+    existing.add_argument('--skip-existing', action='store_true',
+                          help='Keep existing files without asking')
+    parser.add_argument('-j', '--jobs', type=int, default=8,
+                        help='Number of threads writing files of a manifest (default: 8)')
+    parser.add_argument('--cppgen', action='store_true',
+                        help='Also generate the definitions of the generated headers with cppgen')
     return parser
 
-def generate(type: str, namespaces: list[str], class_name: str, suffix: str) -> str:
+class Entry(NamedTuple):
+    type: str
+    namespaces: list[str]
+    class_name: str
+
+def parse_entry(type: str, name: str) -> Entry:
+    if type not in TYPES:
+        raise ValueError(f'invalid type: {type!r} (choose from {", ".join(TYPES)})')
+    identifiers = [id.strip() for id in name.strip().split('::')]
+    if not all(identifiers):
+        raise ValueError(f'invalid name: {name!r}')
+    return Entry(type, identifiers[:-1], identifiers[-1])
+
+def read_manifest(filename: str) -> list[Entry]:
+    """Reads the entries of a manifest. A JSON manifest is a list of "ns::Name"
+    strings, [type, name] pairs or {"type": ..., "name": ...} objects. A CSV
+    manifest has a type and a name per row, or only a name; a header row is optional."""
+    if filename == '-':
+        text = sys.stdin.read()
+    else:
+        with open(filename, 'r', newline='') as f:
+            text = f.read()
+    if text.lstrip().startswith('['):
+        rows = []
+        for item in json.loads(text):
+            if isinstance(item, str):
+                rows.append(['class', item])
+            elif isinstance(item, dict):
+                rows.append([item.get('type', 'class'), item['name']])
+            else:
+                rows.append(list(item))
+    else:
+        rows = [row for row in csv.reader(text.splitlines()) if row and not row[0].lstrip().startswith('#')]
+        if rows and [cell.strip().lower() for cell in rows[0]] in (['type', 'name'], ['name']):
+            rows = rows[1:]
+        rows = [['class'] + row if len(row) == 1 else row for row in rows]
+    entries = []
+    for i, row in enumerate(rows, 1):
+        if len(row) != 2:
+            raise ValueError(f'entry {i}: expected a type and a name, got {row!r}')
+        try:
+            entries.append(parse_entry(str(row[0]).strip(), str(row[1])))
+        except ValueError as e:
+            raise ValueError(f'entry {i}: {e}') from None
+    return entries
+
+def generate(type: str, namespaces: list[str], class_name: str, suffix: str, conv: Convention) -> str:
     guard = convention.header_guard(namespaces, class_name, suffix)
     result = '#ifndef ' + guard + '\n'
     result += '#define ' + guard + '\n\n'
     if namespaces:
         result += 'namespace '
-        result += '::'.join(namespaces) + convention.block_start() + '\n'
+        result += '::'.join(namespaces) + conv.block_start + '\n'
 
-    result += type + ' ' + class_name + convention.block_start()
+    result += type + ' ' + class_name + conv.block_start
     if type == 'class':
         result += 'public:\n'
     if type == 'class' or type == 'struct':
-        result += convention.indent() + class_name + convention.space_after_func_name() + '();\n'
+        result += conv.indent + class_name + conv.space_after_func_name + '();\n'
     if type == 'class':
-        result += convention.indent() + '~' + class_name + convention.space_after_func_name() + '();\n'
-        arg_type = convention.type_spacing('const ' + class_name + ' &')
-        result += convention.indent() + class_name + convention.space_after_func_name() + '(' + arg_type + 'other);\n'
-        arg_type = convention.type_spacing(class_name + ' &&')
-        result += convention.indent() + class_name + convention.space_after_func_name() + '(' + arg_type + 'other);\n'
+        result += conv.indent + '~' + class_name + conv.space_after_func_name + '();\n'
+        arg_type = conv.type_spacing('const ' + class_name + ' &')
+        result += conv.indent + class_name + conv.space_after_func_name + '(' + arg_type + 'other);\n'
+        arg_type = conv.type_spacing(class_name + ' &&')
+        result += conv.indent + class_name + conv.space_after_func_name + '(' + arg_type + 'other);\n'
         result += '\nprivate:\n'
     result += '};\n'
 
@@ -52,31 +114,116 @@ def generate(type: str, namespaces: list[str], class_name: str, suffix: str) ->
     result += '\n#endif /* ' + guard + ' */\n'
     return result
 
+def header_filename(namespaces: list[str], class_name: str, suffix: str, conv: Convention) -> str:
+    """The header of a class, in a directory per namespace"""
+    return path.join(*namespaces, conv.convert_case(class_name) + suffix)
+
+def overwrite(filename: str, args: argparse.Namespace) -> bool:
+    """Whether an existing file may be replaced; only asks without --force or --skip-existing"""
+    if args.force or args.skip_existing:
+        return args.force
+    return query_yn(f"Overwrite?: {filename}")
+
+def define(filename: str, args: argparse.Namespace, conv: Convention) -> str:
+    """Generates the definitions of a header with cppgen. An existing definition
+    file is only replaced with --force."""
+    # Imported here, so that plain hppgen runs do not load the parser
+    from cppgen.cppgen import arg_parser as cppgen_arg_parser, candidates, try_process
+    cpp_args = cppgen_arg_parser().parse_args([])
+    if not args.force and any(path.exists(c) for c in candidates(filename, cpp_args)):
+        return f'Skip: {filename} (definition already exists)'
+    output, error = try_process(filename, cpp_args, conv, None)
+    if error is None:
+        try:
+            write_atomic(output.filename, output.source)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+    if error is not None:
+        return f'Error: {filename} ({error})'
+    return f'Generate: {filename} -> {output.filename}'
+
+def generate_manifest(entries: list[Entry], args: argparse.Namespace, conv: Convention) -> int:
+    """Writes the headers of a manifest, and their definitions with --cppgen.
+    Headers are rendered up front and written by a pool of threads; each
+    directory is created once. Returns the number of failures."""
+    from concurrent.futures import ThreadPoolExecutor
+    headers = {}
+    types = {}
+    for entry in entries:
+        filename = header_filename(entry.namespaces, entry.class_name, args.suffix, conv)
+        if filename in headers:
+            print(f'Error: {filename} (listed more than once)')
+            return 1
+        headers[filename] = generate(entry.type, entry.namespaces, entry.class_name, args.suffix, conv)
+        types[filename] = entry.type
+    for directory in {path.dirname(filename) for filename in headers}:
+        Path(directory or '.').mkdir(parents=True, exist_ok=True)
+
+    def write(filename: str) -> tuple[bool, str]:
+        try:
+            if path.exists(filename) and not args.force:
+                if args.skip_existing:
+                    return False, f'Skip: {filename} (already exists)'
+                return False, f'Error: {filename} (already exists; use --force or --skip-existing)'
+            write_atomic(filename, [headers[filename]])
+        except Exception as e:
+            return False, f'Error: {filename} ({type(e).__name__}: {e})'
+        return True, f'Generate: {filename}'
+
+    failures = 0
+    generated = []
+    with ThreadPoolExecutor(max(args.jobs, 1)) as pool:
+        for filename, (written, message) in zip(headers, pool.map(write, headers)):
+            print(message)
+            if written:
+                generated.append(filename)
+            failures += message.startswith('Error')
+        if args.cppgen:
+            generated = [filename for filename in generated if types[filename] not in NO_FUNCTIONS]
+            for message in pool.map(lambda filename: define(filename, args, conv), generated):
+                print(message)
+                failures += message.startswith('Error')
+    return failures
+
 def main():
     argparser = arg_parser()
     args = argparser.parse_args()
-    convention.filename_style = args.file_convention
-    convention.style = args.convention
-    convention.indent_style = args.indent
-    convention.tabsize_style = args.tabsize
-
-    identifiers = args.name[0].strip().split('::')
-    identifiers = [id.strip() for id in identifiers]
-    namespaces = identifiers[:-1]
-    class_name = identifiers[-1]
-
-    src = generate(args.type, namespaces, class_name, args.suffix)
-    filename = convention.convert_case(class_name) + args.suffix
-    dir = ''
-    if namespaces:
-        dir = os.path.sep.join(namespaces) + os.path.sep
-        filename = dir + filename
-    if path.exists(filename):
-        res = query_yn(f"Overwrite?: {filename}")
-        if not res:
-            print(f'Skip: {filename} (already exists)')
-            return
-    Path(dir).mkdir(parents=True, exist_ok=True)
+    conv = Convention(style=args.convention, indent_style=args.indent,
+                      filename_style=args.file_convention, tabsize_style=args.tabsize)
+
+    if args.manifest is not None:
+        if args.type is not None:
+            argparser.error('TYPE and NAME cannot be used with --manifest')
+        try:
+            entries = read_manifest(args.manifest)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            argparser.error(f'{args.manifest}: {e}')
+        failures = generate_manifest(entries, args, conv)
+        if failures:
+            print(f'Failed: {failures} file(s)')
+            sys.exit(1)
+        return
+
+    if args.type is None:
+        argparser.error('the following arguments are required: NAME')
+    if args.name is None:
+        if args.type in TYPES:
+            argparser.error('the following arguments are required: NAME')
+        # A single positional argument is the name
+        args.type, args.name = 'class', args.type
+    try:
+        type, namespaces, class_name = parse_entry(args.type, args.name)
+    except ValueError as e:
+        argparser.error(str(e))
+
+    src = generate(type, namespaces, class_name, args.suffix, conv)
+    filename = header_filename(namespaces, class_name, args.suffix, conv)
+    if path.exists(filename) and not overwrite(filename, args):
+        print(f'Skip: {filename} (already exists)')
+        return
+    Path(path.dirname(filename) or '.').mkdir(parents=True, exist_ok=True)
     with open(filename, 'w') as f:
         f.write(src)
     print(f'Generate: {filename}')
+    if args.cppgen and type not in NO_FUNCTIONS:
+        print(define(filename, args, conv))
@@ -0,0 +1,141 @@
+import os, json, hashlib
+from os import path
+from typing import Iterable, Optional
+from cppgen.cache import default_dir
+from cppgen.discover import find
+from cppgen.symbols import Definitions, Signature
+
+# Bump when the format of the index, or the signatures of the same source, change
+VERSION = 4
+DEFINITION_PATTERNS = ['*.c', '*.cc', '*.cpp', '*.cxx', '*.c++', '*.ipp', '*.inl', '*.tpp']
+
+def default_filename(roots: Iterable[str]) -> str:
+    """The index of the source trees, in the cache directory"""
+    key = hashlib.sha256(repr(sorted(path.abspath(root) for root in roots)).encode()).hexdigest()
+    return path.join(default_dir(), 'index', key + '.json')
+
+class Index:
+    """The function definitions of every definition file in source trees, by file.
+    Files are only scanned again when their modification time or size changes,
+    and each signature counts the files defining it, so lookups are O(1)."""
+    filename: Optional[str]
+    files: dict[str, tuple[int, int, frozenset[Signature]]]
+    counts: dict[Signature, int]
+    # Whether the file holds what is in memory
+    saved: bool
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename = filename
+        self.files = {}
+        self.counts = {}
+        self.saved = filename is not None
+        if filename is not None:
+            self._load()
+
+    def __contains__(self, signature: Signature) -> bool:
+        return signature in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __reduce__(self):
+        # Worker processes read the saved index, once each, rather than receive a copy per
+        # header; an index that could not be saved is copied, as the file is out of date
+        if not self.saved:
+            return super().__reduce__()
+        return load, (self.filename,)
+
+    def elsewhere(self, filename: str) -> 'Elsewhere':
+        """The signatures defined in files other than filename"""
+        return Elsewhere(self, filename)
+
+    def update(self, roots: Iterable[str], include: Optional[list[str]] = None,
+               exclude: Optional[list[str]] = None, gitignore: bool = False) -> int:
+        """Scans the definition files under the roots that are new or changed, and
+        forgets those that are gone. Returns the number of files scanned."""
+        seen = set()
+        scanned = 0
+        for filename in find(roots, include or DEFINITION_PATTERNS, exclude, gitignore):
+            filename = path.abspath(filename)
+            seen.add(filename)
+            try:
+                st = os.stat(filename)
+                entry = self.files.get(filename)
+                if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+                    continue
+                with open(filename, 'r') as f:
+                    signatures = frozenset(Definitions(f.read()).signatures)
+            except (OSError, UnicodeDecodeError):
+                signatures = None
+            self._remove(filename)
+            if signatures is not None:
+                self._add(filename, (st.st_mtime_ns, st.st_size, signatures))
+            scanned += 1
+        for filename in [filename for filename in self.files if filename not in seen]:
+            self._remove(filename)
+            scanned += 1
+        if scanned:
+            self.saved = False
+        return scanned
+
+    def _add(self, filename: str, entry: tuple[int, int, frozenset[Signature]]) -> None:
+        self.files[filename] = entry
+        for signature in entry[2]:
+            self.counts[signature] = self.counts.get(signature, 0) + 1
+
+    def _remove(self, filename: str) -> None:
+        entry = self.files.pop(filename, None)
+        if entry is None:
+            return
+        for signature in entry[2]:
+            n = self.counts[signature] - 1
+            if n:
+                self.counts[signature] = n
+            else:
+                del self.counts[signature]
+
+    def _load(self) -> None:
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != VERSION:
+                return
+            for filename, (mtime, size, signatures) in data['files'].items():
+                self._add(filename, (mtime, size, frozenset((name, tuple(types), const)
+                                                            for name, types, const in signatures)))
+        except (OSError, ValueError, KeyError, TypeError):
+            self.files = {}
+            self.counts = {}
+
+    def save(self) -> None:
+        """Writes the index over its file, atomically. A failure only loses the update."""
+        from cppgen.utils import write_atomic
+        files = {filename: [mtime, size, sorted([name, list(types), const] for name, types, const in signatures)]
+                 for filename, (mtime, size, signatures) in self.files.items()}
+        try:
+            os.makedirs(path.dirname(self.filename), exist_ok=True)
+            write_atomic(self.filename, [json.dumps({'version': VERSION, 'files': files})])
+            self.saved = True
+        except OSError:
+            pass
+
+_loaded: dict[str, Index] = {}
+
+def load(filename: str) -> Index:
+    """The saved index, read once per process"""
+    if filename not in _loaded:
+        _loaded[filename] = Index(filename)
+    return _loaded[filename]
+
+class Elsewhere:
+    """The signatures of an index that a file other than one defines"""
+    counts: dict[Signature, int]
+    own: frozenset[Signature]
+
+    def __init__(self, index: Index, filename: str):
+        self.counts = index.counts
+        entry = index.files.get(path.abspath(filename))
+        self.own = entry[2] if entry is not None else frozenset()
+
+    def __contains__(self, signature: Signature) -> bool:
+        return self.counts.get(signature, 0) > (signature in self.own)
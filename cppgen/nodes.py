@@ -1,77 +1,112 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Union
+from mmap import mmap
 from abc import ABC, abstractproperty
-import re
-from cppgen.utils import ptn, recur_ptn, xstrip
-import cppgen.convention as convention
+import os, heapq
+from bisect import bisect_left, bisect_right
+from cppgen.utils import ptn, recur_ptn, lazy_ptn, match_braces, is_balanced, xstrip, xintern
+from cppgen.convention import Convention
+from cppgen.prepass import Reduced, reduce, reduce_bytes
+from cppgen import declarations, stats
+
+# Headers are only split in shards of about this size or more
+SHARD_SIZE = 256 * 1024
+# Shards per worker, so that workers finish close together
+SHARDS_PER_JOB = 4
 
 class Ptn:
-    IDENTIFIER = r'(?:[a-zA-Z_][a-zA-Z0-9_]*(?:::[a-zA-Z_][a-zA-Z0-9_]*)*)'
-    BLOCK = recur_ptn(r'(?:{(?:[^{}]|(?:?R))*})')
+    IDENTIFIER = lazy_ptn(lambda: r'(?:[a-zA-Z_][a-zA-Z0-9_]*(?:::[a-zA-Z_][a-zA-Z0-9_]*)*)')
+    NAMESPACE_START = lazy_ptn(lambda: ptn(rf'namespace ({Ptn.IDENTIFIER.pattern})\s*'))
 
-    NAMESPACE_START = ptn(rf'namespace ({IDENTIFIER})\s*')
+    # Parameters never hold a ';', so a class never starts in an earlier statement
+    TEMPLATE_PARAMS = lazy_ptn(lambda: recur_ptn(r'(?:<(?:[^<>;]|(?:?R))*>)'))
+    TEMPLATE = lazy_ptn(lambda: ptn(rf'template ({Ptn.TEMPLATE_PARAMS.pattern})'))
+    TEMPLATE_TYPENAME = lazy_ptn(lambda: r'(?:typename|class)\s+([a-zA-Z_][a-zA-Z0-9_]*)')
 
-    TEMPLATE_PARAMS = recur_ptn(r'(?:<(?:[^<>]|(?:?R))*>)')
-    TEMPLATE = ptn(rf'template ({TEMPLATE_PARAMS})')
+    CLASS_START = lazy_ptn(lambda: ptn(rf'(?:{Ptn.TEMPLATE.pattern} )?(class|struct) ({Ptn.IDENTIFIER.pattern})\s*'))
+    CLASS_BASES = lazy_ptn(lambda: r'(?:final\s*)?(?::[^;{}]*)?')
+    CLASS_END = lazy_ptn(lambda: r'\s*;')
 
-    CLASS_START = ptn(rf'(?:{TEMPLATE} )?(class|struct) ({IDENTIFIER})\s*')
-    CLASS_BLOCK = ptn(rf'({BLOCK})\s*;')
+    # Declarations are split into statements at these, then parsed by tokens
+    DELIMITER = lazy_ptn(lambda: r'[;{}()]')
 
-    TYPE_TMP = recur_ptn(r'(?:[<(](?:[^<>()]|(?:?R))*[)>])')
-    TYPE = ptn(rf'(?:const )?(?:{IDENTIFIER})\s*(?:{TYPE_TMP})?(?: |\s*\*+\s*)(?:const)?\s*&*')
-
-    FUNC_HEAD_SPECIFIER = r'(?:static|inline|_Noreturn)'
-    FUNC_TAIL_SPECIFIER = r'(?:const|(?:noexcept|throw)(?:\([^()]*\))?)'
-    FUNC = ptn(rf'(?:{TEMPLATE} )?({FUNC_HEAD_SPECIFIER}(?: {FUNC_HEAD_SPECIFIER})*)?({TYPE})?\s*(~?{IDENTIFIER})\s*\(([^;]*?)\)\s*({FUNC_TAIL_SPECIFIER}(?: {FUNC_TAIL_SPECIFIER})*)?\s*;')
-
-@dataclass
 class Node(ABC):
+    """A namespace, class or function spanning [start, end) of the source.
+    Its root namespace and name relative to it are resolved once, when attached."""
+    __slots__ = ('start', 'end', 'parent', 'root_ns', 'rel_name')
     start: int
     end: int
     parent: Optional[Node]
+    root_ns: Optional[Namespace]
+    rel_name: str
+
+    def __init__(self, start: int, end: int, parent: Optional[Node]):
+        self.start = start
+        self.end = end
+        self.attach(parent)
+
+    def attach(self, parent: Optional[Node]) -> None:
+        self.parent = parent
+        if parent is None:
+            self.root_ns = self if isinstance(self, Namespace) else None
+            self.rel_name = '' if self.root_ns is self else self.repr_name
+        else:
+            self.root_ns = parent.root_ns
+            self.rel_name = parent.rel_name + '::' + self.repr_name if parent.rel_name else self.repr_name
 
     @abstractproperty
     def repr_name(self) -> str:
         pass
 
-@dataclass
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.repr_name!r}, {self.start}, {self.end})'
+
 class Namespace(Node):
+    __slots__ = ('name',)
     name: str
 
+    def __init__(self, start: int, end: int, parent: Optional[Node], name: str):
+        self.name = name
+        super().__init__(start, end, parent)
+
     @property
     def repr_name(self) -> str:
         return self.name
 
-    @property
-    def repr_start(self) -> str:
-        return 'namespace %s%s\n' % (self.name, convention.block_start())
+    def repr_start(self, conv: Convention) -> str:
+        return 'namespace %s%s\n' % (self.name, conv.block_start)
 
     @property
     def repr_end(self) -> str:
         return '\n\n} /* namespace %s */' % (self.name)
 
-@dataclass
 class Class(Node):
+    __slots__ = ('template_params', 'keyword', 'name', 'template_typenames', 'repr_name')
     template_params: Optional[str]
     keyword: str
     name: str
-
-    @property
-    def repr_name(self) -> str:
-        if self.template_params is None:
-            return self.name
+    template_typenames: list[str]
+    repr_name: str
+
+    def __init__(self, start: int, end: int, parent: Optional[Node],
+                 template_params: Optional[str], keyword: str, name: str):
+        self.template_params = template_params
+        self.keyword = keyword
+        self.name = name
+        if template_params is None:
+            self.template_typenames = []
+            self.repr_name = name
         else:
-            typenames = self.extract_template_typenames()
-            typenames = ','.join(typenames)
-            return f'{self.name}<{typenames}>'
+            self.template_typenames = Ptn.TEMPLATE_TYPENAME.findall(template_params)
+            self.repr_name = f'{name}<{",".join(self.template_typenames)}>'
+        super().__init__(start, end, parent)
 
     def extract_template_typenames(self) -> list[str]:
         assert self.template_params is not None
-        return re.findall(r'(?:typename|class)\s+([a-zA-Z_][a-zA-Z0-9_]*)', self.template_params)
+        return self.template_typenames
 
-@dataclass
 class Func(Node):
+    __slots__ = ('template_params', 'head_specifiers', 'return_type', 'name', 'parameters', 'tail_specifiers')
     template_params: Optional[str]
     head_specifiers: Optional[str]
     return_type: Optional[str]
@@ -79,59 +114,55 @@ class Func(Node):
     parameters: str
     tail_specifiers: Optional[str]
 
+    def __init__(self, start: int, end: int, parent: Optional[Node],
+                 template_params: Optional[str], head_specifiers: Optional[str], return_type: Optional[str],
+                 name: str, parameters: str, tail_specifiers: Optional[str]):
+        self.template_params = template_params
+        self.head_specifiers = head_specifiers
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.tail_specifiers = tail_specifiers
+        super().__init__(start, end, parent)
+
     @property
     def repr_name(self) -> str:
         return self.name
 
     @property
-    def is_inline(self) -> str:
-        return self.head_specifiers is not None and 'inline' in self.head_specifiers
+    def is_inline(self) -> bool:
+        """Whether the definition must be visible to every translation unit"""
+        return self.head_specifiers is not None \
+           and any(spec in self.head_specifiers.split() for spec in declarations.DEFINITION_SPECIFIERS)
 
-    @property
-    def rel_name(self) -> str:
-        """The name relative to the root"""
-        prefix = ''
-        p = self
-        while p.parent is not None:
-            p = p.parent
-            if self.ns is not None and p.parent is None:
-                break
-            prefix = p.repr_name + '::' + prefix if prefix else p.repr_name
-        return prefix + '::' + self.name if prefix else self.name
-
-    @property
-    def repr(self) -> str:
+    def repr(self, conv: Convention) -> str:
         template = ''
         if isinstance(self.parent, Class) and self.parent.template_params is not None:
             template += 'template ' + self.parent.template_params + '\n'
         template += 'template ' + self.template_params + '\n' if self.template_params else ''
-        rtn_type = convention.type_spacing(self.return_type) if self.return_type is not None else ''
-        head_spec = 'inline ' if self.is_inline else ''
+        rtn_type = conv.type_spacing(self.return_type) if self.return_type is not None else ''
+        head_spec = ''.join(spec + ' ' for spec in (self.head_specifiers or '').split()
+                            if spec in declarations.DEFINITION_SPECIFIERS)
         tail_spec = ' ' + self.tail_specifiers if self.tail_specifiers is not None else ''
 
-        pre_params = template + head_spec + rtn_type + self.rel_name + convention.space_after_func_name() + '('
+        pre_params = template + head_spec + rtn_type + self.rel_name + conv.space_after_func_name + '('
         post_params = ')' + tail_spec
-        params = self.repr_params(pre_params, post_params)
-        body = (convention.indent() + '// TODO\n') if convention.insert_todo else ''
-        return pre_params + params + post_params + convention.block_start() + body + '}'
-
-    def repr_params(self, pre_params: str, post_params: str) -> str:
-        piter = re.finditer(rf'(?:^|,)\s*({Ptn.TYPE})({Ptn.IDENTIFIER})', self.parameters)
-        params = []
-        for match in piter:
-            p = match.group(1).lstrip() + match.group(2).rstrip()
-            params.append(p)
+        params = self.repr_params(conv, pre_params, post_params)
+        return pre_params + params + post_params + conv.block_start + conv.todo + '}'
+
+    def repr_params(self, conv: Convention, pre_params: str, post_params: str) -> str:
+        params = declarations.split_params(self.parameters)
         pre = pre_params.splitlines()[-1]
         singleline_params = ', '.join(params)
-        multiline = len(pre) + len(', '.join(params)) + len(post_params) > convention.columns()
+        multiline = params and len(pre) + len(', '.join(params)) + len(post_params) > conv.columns
         if not multiline:
             return singleline_params
         else:
-            indents = convention.spaces_to_indent(' ' * len(pre)) if convention.param_indent_style() == 'vert_align' else (convention.indent() * 2)
+            indents = conv.spaces_to_indent(' ' * len(pre)) if conv.param_indent_style == 'vert_align' else (conv.indent * 2)
             result = ''
-            if convention.param_indent_style() == 'double_indent' \
-            or len(pre) + len(params[0]) + len(',') > convention.columns():
-                indents = convention.indent() * 2
+            if conv.param_indent_style == 'double_indent' \
+            or len(pre) + len(params[0]) + len(',') > conv.columns:
+                indents = conv.indent * 2
                 result += '\n' + indents
             for i, p in enumerate(params):
                 if i < len(params) - 1:
@@ -140,13 +171,6 @@ class Func(Node):
                     result += p
             return result
 
-    @property
-    def root_ns(self) -> Optional[Namespace]:
-        p = self
-        while p.parent is not None:
-            p = p.parent
-        return p if isinstance(p, Namespace) else None
-
     @property
     def ns(self) -> Optional[Namespace]:
         p = self
@@ -156,20 +180,188 @@ class Func(Node):
                 return p
         return None
 
+def first_at(nodes: list[Node], pos: int) -> int:
+    """The index of the first of the nodes, sorted by start, that starts at or after pos"""
+    lo, hi = 0, len(nodes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if nodes[mid].start < pos:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+class ScopeStack:
+    """Resolves the innermost enclosing scope of nodes visited in source order.
+    Nodes outside all of the scopes are in `outer`."""
+    scopes: list[Node]
+    outer: Optional[Node]
+
+    def __init__(self, scopes: list[Node], outer: Optional[Node] = None):
+        self.scopes = scopes
+        self.outer = outer
+        self._next = 0
+        self._stack = []
+
+    def push(self, scope: Node) -> None:
+        while self._stack and self._stack[-1].end <= scope.start:
+            self._stack.pop()
+        self._stack.append(scope)
+
+    def enclosing(self, start: int, end: int) -> Optional[Node]:
+        while self._next < len(self.scopes) and self.scopes[self._next].start < start:
+            self.push(self.scopes[self._next])
+            self._next += 1
+        while self._stack and self._stack[-1].end <= end:
+            self._stack.pop()
+        return self._stack[-1] if self._stack else self.outer
+
 class Tree:
-    source: str
+    """The declarations of a header. Patterns run over the reduced text, without
+    comments, literals and preprocessor directives, but nodes hold source offsets."""
+    source: Union[str, bytes, mmap]
     namespaces: list[Namespace]
     classes: list[Class]
     functions: list[Func]
 
-    def __init__(self, source: str):
+    def __init__(self, source: Union[str, bytes, mmap], jobs: int = 1):
+        """The source may be the UTF-8 bytes of a header, such as a memory map, which
+        is parsed without decoding all of it; offsets are then in bytes. With jobs
+        other than 1, a large header is parsed in shards by that many worker
+        processes (0: the number of CPUs), with the same result."""
+        with stats.phase('prepass'):
+            if isinstance(source, str):
+                self._reduced = reduce(source)
+            else:
+                self._reduced = reduce_bytes(source)
+                if self._reduced is None:
+                    # Decoded as a file opened for reading text would be
+                    source = str(source, 'utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                    self._reduced = reduce(source)
         self.source = source
+        self._text = self._reduced.text
+        jobs = jobs if jobs > 0 else os.cpu_count()
+        self.namespaces, self.classes, self.functions = self._parse(0, len(self._text), None, jobs)
+        self._group_functions()
+
+    def _parse(self, lo: int, hi: int, outer: Optional[Node], jobs: int = 1) -> tuple[list[Namespace], list[Class], list[Func]]:
+        """Parses the nodes in [lo, hi) of the reduced text, in `outer`. With jobs
+        other than 1, the whole text is split in shards parsed by worker processes."""
         self.namespaces = []
         self.classes = []
         self.functions = []
-        self._fetch_namespaces()
-        self._fetch_classes()
-        self._fetch_functions()
+        # Only needed while parsing
+        self._braces = match_braces(self._text, lo, hi)
+        self._scope_braces = []
+        # Namespaces are only ever placed in namespaces
+        outer_ns = outer
+        while outer_ns is not None and not isinstance(outer_ns, Namespace):
+            outer_ns = outer_ns.parent
+        self._region = (lo, hi, outer, outer_ns)
+        with stats.phase('_fetch_namespaces'):
+            self._fetch_namespaces()
+        shards = self._shards(jobs) if jobs != 1 else []
+        if len(shards) > 1:
+            # Classes and functions are found together, in the workers
+            with stats.phase('_fetch_functions'):
+                found_classes, found_functions = self._find_in_shards(shards, jobs)
+        else:
+            with stats.phase('_fetch_classes'):
+                found_classes = find_classes(self._text, lo, hi, self._braces, self._scope_braces)
+            with stats.phase('_fetch_functions'):
+                found_functions = find_functions(self._text, lo, hi, self._braces, self._scope_braces)
+        with stats.phase('_fetch_classes'):
+            self._fetch_classes(found_classes)
+        with stats.phase('_fetch_functions'):
+            self._fetch_functions(found_functions)
+        self._braces = self._scope_braces = None
+        stats.count('namespaces', len(self.namespaces))
+        stats.count('classes', len(self.classes))
+        stats.count('functions', len(self.functions))
+        for node in self.namespaces + self.classes + self.functions:
+            node.start = self._reduced.to_source(node.start)
+            node.end = self._reduced.to_source_end(node.end)
+        return self.namespaces, self.classes, self.functions
+
+    def update(self, start: int, end: int, new_text: str) -> None:
+        """Replaces source[start:end] with new_text, re-parsing only the interior of
+        the innermost namespace or class around the edit. Nodes outside it are kept,
+        with their offsets shifted. Falls back to a full parse if there is no such
+        scope, or if the edit unbalances its interior, leaves a comment, literal or
+        `#if 0` open, or affects template parameters holding one of its braces."""
+        if not isinstance(self.source, str):
+            raise TypeError('only a tree parsed from text can be updated')
+        source = self.source[:start] + new_text + self.source[end:]
+        delta = len(new_text) - (end - start)
+        scope, lo, hi = None, 0, len(self.source)
+        for node in self.namespaces + self.classes:
+            if node.start < start < node.end and (scope is None or node.start > scope.start):
+                interior = self._interior(node)
+                if interior[0] <= start and end <= interior[1]:
+                    scope, (lo, hi) = node, interior
+        fi, fj = first_at(self.functions, lo), first_at(self.functions, hi)
+        straddles = fi > 0 and self.functions[fi - 1].end > lo or fj > fi and self.functions[fj - 1].end > hi
+        if scope is None or straddles:
+            self.__init__(source)
+            return
+        # The closing brace is scanned too: unless it is kept, a comment, literal or
+        # #if 0 left unterminated in the interior runs past it
+        region = reduce(source, lo, hi + delta + 1)
+        if not region.text.endswith('}') or region.to_source(len(region.text) - 1) != hi + delta \
+                or not is_balanced(region.text[:-1]):
+            self.__init__(source)
+            return
+        region = Reduced(region.text[:-1], region.text_starts, region.source_starts)
+
+        old = self.namespaces, self.classes, self.functions
+        text_lo, text_hi = self._reduced.to_text(lo), self._reduced.to_text(hi)
+        reduced = self._reduced.splice(text_lo, text_hi, region, delta)
+        # A class whose template parameters hold a brace of the scope crosses it
+        if in_template_params(self._text, text_lo - 1) or in_template_params(self._text, text_hi) \
+                or in_template_params(reduced.text, text_lo - 1) \
+                or in_template_params(reduced.text, text_lo + len(region.text)):
+            self.__init__(source)
+            return
+        self.source = source
+        self._reduced = reduced
+        self._text = reduced.text
+        # The braces of the scope end statements, so declarations never cross them
+        new = self._parse(text_lo, text_lo + len(region.text), scope)
+
+        group = self._functions_by_ns.setdefault(scope.root_ns, [])
+        gi, gj = first_at(group, lo), first_at(group, hi)
+        for fn in old[2][fi:fj]:
+            if fn.root_ns is not scope.root_ns:
+                self._functions_by_ns.pop(fn.root_ns, None)
+        group[gi:gj] = [fn for fn in new[2] if fn.root_ns is scope.root_ns]
+        for fn in new[2]:
+            if fn.root_ns is not scope.root_ns:
+                self._functions_by_ns.setdefault(fn.root_ns, []).append(fn)
+
+        def splice(nodes: list[Node], new_nodes: list[Node]) -> list[Node]:
+            i, j = first_at(nodes, lo), first_at(nodes, hi)
+            for node in nodes[j:]:
+                node.start += delta
+                node.end += delta
+            return nodes[:i] + new_nodes + nodes[j:]
+
+        # Only namespaces and classes can enclose the interior
+        for node in old[0] + old[1]:
+            if node.start < lo and node.end > hi:
+                node.end += delta
+        self.namespaces, self.classes, self.functions = (splice(*pair) for pair in zip(old, new))
+
+    def _group_functions(self) -> None:
+        self._functions_by_ns = {}
+        for fn in self.functions:
+            self._functions_by_ns.setdefault(fn.root_ns, []).append(fn)
+
+    def _interior(self, scope: Node) -> tuple[int, int]:
+        """The source offsets just inside the braces of a namespace or class"""
+        start = self._reduced.to_text(scope.start)
+        end = self._reduced.to_text(scope.end - 1) + 1
+        return (self._reduced.to_source(self._text.index('{', start)) + 1,
+                self._reduced.to_source(self._text.rindex('}', start, end)))
 
     @property
     def need_ipp(self) -> bool:
@@ -186,69 +378,192 @@ class Tree:
         return [ns for ns in self.namespaces if ns.parent is None]
 
     def get_functions_for(self, root_ns: Optional[Namespace]) -> list[Func]:
-        result = []
-        for fn in self.functions:
-            if fn.root_ns is root_ns:
-                result.append(fn)
-        return result
+        return self._functions_by_ns.get(root_ns, [])
 
     def _fetch_namespaces(self) -> None:
-        block_regex = re.compile(Ptn.BLOCK)
-        for match in re.finditer(Ptn.NAMESPACE_START, self.source):
-            match2 = block_regex.search(self.source, match.end())
-            if match2:
+        lo, hi, _, outer_ns = self._region
+        scopes = ScopeStack([], outer_ns)
+        for match in Ptn.NAMESPACE_START.finditer(self._text, lo, hi):
+            stats.count('namespace_matches')
+            end = block_end(self._text, self._braces, match.end())
+            if end is not None:
                 name = match.group(1).strip()
                 start = match.start()
-                end = match2.end()
-                parent = None
-                for ns in self.namespaces:
-                    if ns.start < start and ns.end > end:
-                        parent = ns
-                obj = Namespace(start, end, parent, name)
+                obj = Namespace(start, end, scopes.enclosing(start, end), name)
+                self._scope_braces += (match.end(), end - 1)
+                scopes.push(obj)
                 self.namespaces.append(obj)
 
-    def _fetch_classes(self) -> None:
-        block_regex = re.compile(Ptn.CLASS_BLOCK)
-        for match in re.finditer(Ptn.CLASS_START, self.source):
-            match2 = block_regex.search(self.source, match.end())
+    def _fetch_classes(self, found: list[tuple]) -> None:
+        _, _, outer, _ = self._region
+        scopes = ScopeStack(self.namespaces, outer)
+        for start, end, template, keyword, name in found:
+            obj = Class(start, end, scopes.enclosing(start, end), template, keyword, name)
+            scopes.push(obj)
+            self.classes.append(obj)
+
+    def _fetch_functions(self, found: list[tuple]) -> None:
+        _, _, outer, _ = self._region
+        scopes = ScopeStack(list(heapq.merge(self.namespaces, self.classes, key=lambda node: node.start)), outer)
+        for start, end, template_params, head_specifiers, return_type, name, parameters, tail_specifiers in found:
+            parent = scopes.enclosing(start, end)
+            if return_type is None and not name.startswith('operator'):
+                # Without a return type, only constructors and destructors are declarations
+                if not (isinstance(parent, Class) and name.lstrip('~') == parent.name):
+                    continue
+            # Types and specifiers repeat across declarations; share their strings
+            obj = Func(start, end, parent, xintern(template_params), xintern(head_specifiers),
+                       xintern(return_type), name, parameters, xintern(tail_specifiers))
+            self.functions.append(obj)
+
+    def _shards(self, jobs: int) -> list[tuple[int, int]]:
+        """Splits the text after a ';' that only namespaces enclose, into about
+        SHARDS_PER_JOB shards per job and no smaller than SHARD_SIZE on average.
+        Statements, classes and blocks never cross these points."""
+        text = self._text
+        count = min(jobs * SHARDS_PER_JOB, len(text) // SHARD_SIZE)
+        if count < 2:
+            return [(0, len(text))]
+        namespace_braces = set(self._scope_braces[::2])
+        # The outermost blocks other than namespaces, which are disjoint
+        blocks = []
+        for open in sorted(self._braces):
+            if open not in namespace_braces and (not blocks or open >= blocks[-1][1]):
+                blocks.append((open, self._braces[open]))
+        opens = [open for open, _ in blocks]
+        shards = []
+        lo = 0
+        for k in range(1, count):
+            pos = max(lo, len(text) * k // count)
+            while True:
+                pos = text.find(';', pos)
+                i = bisect_right(opens, pos) - 1
+                if pos < 0 or i < 0 or blocks[i][1] <= pos:
+                    break
+                pos = blocks[i][1]
+            if pos < 0:
+                break
+            shards.append((lo, pos + 1))
+            lo = pos + 1
+        shards.append((lo, len(text)))
+        return shards
+
+    def _find_in_shards(self, shards: list[tuple[int, int]], jobs: int) -> tuple[list[tuple], list[tuple]]:
+        """Finds the classes and functions of each shard in a worker process,
+        with offsets rebased onto the whole text"""
+        from concurrent.futures import ProcessPoolExecutor
+        namespace_braces = sorted(self._scope_braces)
+        texts, braces = [], []
+        for lo, hi in shards:
+            texts.append(self._text[lo:hi])
+            braces.append([pos - lo for pos in namespace_braces[bisect_left(namespace_braces, lo):
+                                                                 bisect_left(namespace_braces, hi)]])
+        classes, functions = [], []
+        with ProcessPoolExecutor(min(jobs, len(shards))) as pool:
+            for found_classes, found_functions, counts in pool.map(find_shard, texts, [lo for lo, _ in shards], braces):
+                classes += found_classes
+                functions += found_functions
+                for name, n in counts.items():
+                    stats.count(name, n)
+        return classes, functions
+
+def block_end(text: str, braces: dict[int, int], pos: int) -> Optional[int]:
+    """The end of the block opened at `pos`, if any"""
+    if not text.startswith('{', pos):
+        return None
+    return braces.get(pos)
+
+def find_classes(text: str, lo: int, hi: int, braces: dict[int, int], scope_braces: list[int]) -> list[tuple]:
+    """The start, end, template parameters, keyword and name of each class in
+    [lo, hi) of the reduced text. Adds the braces of their bodies to scope_braces."""
+    found = []
+    for match in Ptn.CLASS_START.finditer(text, lo, hi):
+        stats.count('class_matches')
+        body = Ptn.CLASS_BASES.match(text, match.end()).end()
+        end = block_end(text, braces, body)
+        if end is not None:
+            scope_braces += (body, end - 1)
+            match2 = Ptn.CLASS_END.match(text, end, hi)
             if match2:
-                template = xstrip( match.group(1) )
-                keyword = match.group(2).strip()
-                name = match.group(3).strip()
-                start = match.start()
                 end = match2.end()
-                parent = None
-                for clz in self.classes:
-                    if clz.start < start and clz.end > end:
-                        parent = clz
-                if parent is None:
-                    for ns in self.namespaces:
-                        if ns.start < start and ns.end > end:
-                            parent = ns
-                obj = Class(start, end, parent, template, keyword, name)
-                self.classes.append(obj)
-
-    def _fetch_functions(self) -> None:
-        for match in re.finditer(Ptn.FUNC, self.source):
             template = xstrip( match.group(1) )
-            head_specifiers = xstrip( match.group(2) )
-            if head_specifiers is not None:
-                head_specifiers = re.sub(r'\s+', ' ', head_specifiers)
-            return_type = xstrip( match.group(3) )
-            name = match.group(4).strip()
-            params = match.group(5).strip()
-            tail_specifiers = xstrip( match.group(6) )
-            if tail_specifiers is not None:
-                tail_specifiers = re.sub(r'\s+', ' ', tail_specifiers)
-            start = match.start()
-            end = match.end()
-            parent = None
-            for clz in self.classes:
-                if clz.start < start and clz.end > end:
-                    parent = clz
-            if parent is None:
-                for ns in self.namespaces:
-                    if ns.start < start and ns.end > end:
-                        parent = ns
-            obj = Func(start, end, parent, template, head_specifiers, return_type, name, params, tail_specifiers)
-            self.functions.append(obj)
+            keyword = match.group(2).strip()
+            name = match.group(3).strip()
+            found.append((match.start(), end, template, keyword, name))
+    return found
+
+def in_template_params(text: str, pos: int) -> bool:
+    """Whether text[pos] is in the template parameters of a class pattern match"""
+    i = text.rfind(';', 0, pos)
+    while True:
+        i = text.find('template', i + 1, pos)
+        if i < 0:
+            return False
+        match = Ptn.TEMPLATE.match(text, i)
+        if match is not None and match.end() > pos:
+            return True
+
+def find_functions(text: str, lo: int, hi: int, braces: dict[int, int], scope_braces: list[int]) -> list[tuple]:
+    """Splits [lo, hi) of the reduced text into statements at ';' and at braces
+    outside parentheses, and parses those with parentheses as declarations.
+    Returns the start, end and fields of the declaration of each. Every character is visited
+    a bounded number of times, so this is linear in the text."""
+    # The braces of namespaces and classes end statements even inside parentheses
+    scope_braces = sorted(scope_braces)
+    is_scope = set(scope_braces)
+    found = []
+    start = pos = lo
+    depth = 0
+    parens = False
+    statements = 0
+    while True:
+        match = Ptn.DELIMITER.search(text, pos, hi)
+        if match is None:
+            break
+        delimiter = match.group()
+        pos = match.end()
+        if delimiter == '(':
+            depth += 1
+            parens = True
+            continue
+        if delimiter == ')':
+            depth = max(depth - 1, 0)
+            continue
+        if delimiter == ';':
+            if parens:
+                statements += 1
+                find_function(text, start, pos, found)
+        elif pos - 1 not in is_scope and (depth > 0 or delimiter == '{' and parens):
+            # Function bodies, lambdas and initializers hold no declarations, unless they hold a scope
+            end = braces.get(pos - 1) if delimiter == '{' else None
+            if end is not None and bisect_right(scope_braces, end - 1) == bisect_right(scope_braces, pos - 1):
+                pos = end
+            if depth > 0:
+                continue
+        start = pos
+        depth = 0
+        parens = False
+    stats.count('statements', statements)
+    return found
+
+def find_function(text: str, start: int, end: int, found: list[tuple]) -> None:
+    parsed = declarations.parse(declarations.TOKEN.findall(text, start, end - 1))
+    if parsed is None:
+        return
+    first, decl = parsed
+    tokens = declarations.TOKEN.finditer(text, start, end - 1)
+    for _ in range(first):
+        next(tokens)
+    found.append((next(tokens).start(), end, *decl))
+
+def find_shard(text: str, offset: int, namespace_braces: list[int]) -> tuple[list[tuple], list[tuple], dict[str, int]]:
+    """Finds the classes and functions of a shard starting at offset, given the
+    braces of the namespaces in it, in a worker process. Returns them with offsets
+    in the whole text, and the counts."""
+    record = stats.FileStats('shard')
+    with stats.recording(record):
+        braces = match_braces(text)
+        classes = find_classes(text, 0, len(text), braces, namespace_braces)
+        functions = find_functions(text, 0, len(text), braces, namespace_braces)
+    return ([(start + offset, end + offset, *rest) for start, end, *rest in classes],
+            [(start + offset, end + offset, *rest) for start, end, *rest in functions], record.counts)
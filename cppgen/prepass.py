@@ -0,0 +1,172 @@
+import re
+from bisect import bisect_right
+from mmap import mmap, PAGESIZE
+from typing import Callable, Optional
+try:
+    from mmap import MADV_DONTNEED
+except ImportError:  # Windows
+    MADV_DONTNEED = None
+
+# Regions the declaration patterns never need to see. Every alternative starts
+# with a literal character, which keeps the scan for them fast.
+SKIP = re.compile(r'''//[^\n]*|/\*.*?(?:\*/|\Z)|R"([^()\\\s]{0,16})\(.*?(?:\)\1"|\Z)'''
+                  r'''|"(?:\\.|[^"\\\n])*(?:"|$)|'(?:\\.|[^'\\\n])*(?:'|$)|\#(?:\\\n|[^\n])*''', re.S | re.M)
+DISABLED = re.compile(r'\#[ \t]*if[ \t]+(?:0|false)\b')
+CONDITIONAL = re.compile(r'^[ \t]*#[ \t]*(if|ifdef|ifndef|elif|else|endif)\b(?:\\\n|[^\n])*', re.M)
+# The same patterns, over bytes
+SKIP_BYTES, DISABLED_BYTES, CONDITIONAL_BYTES = (re.compile(p.pattern.encode(), p.flags & ~re.U)
+                                                 for p in (SKIP, DISABLED, CONDITIONAL))
+# Memory maps are released behind the pre-pass in steps of this size
+RELEASE_SIZE = 4 * 1024 * 1024
+
+class Reduced:
+    """Source text without comments, string and character contents, preprocessor
+    directives and `#if 0` regions. Offsets in the text map back to the source."""
+    text: str
+    # Start of each kept segment in the text, and in the source
+    text_starts: list[int]
+    source_starts: list[int]
+
+    def __init__(self, text: str, text_starts: list[int], source_starts: list[int]):
+        self.text = text
+        self.text_starts = text_starts
+        self.source_starts = source_starts
+
+    def to_source(self, pos: int) -> int:
+        i = bisect_right(self.text_starts, pos) - 1
+        return self.source_starts[i] + pos - self.text_starts[i]
+
+    def to_source_end(self, end: int) -> int:
+        """Maps the end of a range, which is just past its last kept character"""
+        return self.to_source(end - 1) + 1
+
+    def to_text(self, pos: int) -> int:
+        """Maps a source offset, which must not be in a removed region"""
+        i = bisect_right(self.source_starts, pos) - 1
+        return self.text_starts[i] + pos - self.source_starts[i]
+
+    def splice(self, lo: int, hi: int, region: 'Reduced', delta: int) -> 'Reduced':
+        """Replaces text[lo:hi] with the reduction of the edited source between them.
+        delta is the change in length of the source."""
+        i = bisect_right(self.text_starts, lo - 1)
+        j = bisect_right(self.text_starts, hi - 1)
+        shift = lo + len(region.text) - hi
+        hi_source = self.to_source(hi) + delta
+        text_starts = self.text_starts[:i] + [lo + t for t in region.text_starts] + [hi + shift] \
+                      + [t + shift for t in self.text_starts[j:]]
+        source_starts = self.source_starts[:i] + region.source_starts + [hi_source] \
+                        + [s + delta for s in self.source_starts[j:]]
+        return Reduced(self.text[:lo] + region.text + self.text[hi:], text_starts, source_starts)
+
+def reduce(source: str, pos: int = 0, endpos: Optional[int] = None) -> Reduced:
+    """Reduces source[pos:endpos] in a single pass. Comments become a space, and
+    literals keep their quotes, so that tokens and offsets of the rest stay intact."""
+    parts = []
+    text_starts, source_starts = scan(source, pos, endpos, lambda start, end: parts.append(source[start:end]),
+                                      parts.append)
+    return Reduced(''.join(parts), text_starts, source_starts)
+
+def reduce_bytes(data) -> Optional[Reduced]:
+    """Reduces the bytes of a source, such as a memory map, without decoding the source.
+    Kept bytes are gathered in a buffer, which is decoded into the text at the end, so
+    the peak is twice the reduced text rather than the source; offsets are in bytes.
+    Returns None unless the text is ASCII and the source has no carriage returns, as only
+    then is the text that of the decoded source, with offsets in bytes and characters alike."""
+    if data.find(b'\r') >= 0:
+        return None
+    text = bytearray()
+    released = 0
+
+    def keep(start: int, end: int) -> None:
+        nonlocal released
+        text.extend(view[start:end])
+        if MADV_DONTNEED is not None and isinstance(data, mmap) and end - released >= RELEASE_SIZE:
+            # The scan never goes back more than a line; pages behind it are dropped
+            # from memory, and read from the file again if needed
+            pos = (end - PAGESIZE) // PAGESIZE * PAGESIZE
+            if pos > released:
+                data.madvise(MADV_DONTNEED, released, pos - released)
+                released = pos
+
+    with memoryview(data) as view:
+        text_starts, source_starts = scan(data, 0, len(data), keep, lambda part: text.extend(part.encode()))
+    try:
+        return Reduced(text.decode('ascii'), text_starts, source_starts)
+    except UnicodeDecodeError:
+        return None
+
+def scan(source, pos: int, endpos: Optional[int], keep: Callable[[int, int], None],
+         insert: Callable[[str], None]) -> tuple[list[int], list[int]]:
+    """Passes the kept ranges of the source, and the text replacing removed regions,
+    to keep and insert in order. Returns the start of each in the text and in the source."""
+    binary = not isinstance(source, str)
+    skip, disabled, newline = (SKIP_BYTES, DISABLED_BYTES, b'\n') if binary else (SKIP, DISABLED, '\n')
+    char = (lambda i: chr(source[i])) if binary else source.__getitem__
+    endpos = len(source) if endpos is None else endpos
+    text_starts = []
+    source_starts = []
+    length = 0
+
+    def emit(start: int, end: int) -> None:
+        nonlocal length
+        text_starts.append(length)
+        source_starts.append(start)
+        keep(start, end)
+        length += end - start
+
+    def replace(text: str, source_start: int) -> None:
+        nonlocal length
+        text_starts.append(length)
+        source_starts.append(source_start)
+        insert(text)
+        length += len(text)
+
+    kept = pos
+    search = pos
+    while True:
+        match = skip.search(source, search, endpos)
+        if match is None:
+            break
+        start = match.start()
+        first = char(start)
+        search = start + 1
+        if first == '#' and source[source.rfind(newline, 0, start) + 1:start].strip():
+            continue  # Not a directive
+        if first == "'" and is_digit_separator(start, char):
+            continue  # As in 1'000; a literal may still have a prefix, as in L'x'
+        emit(kept, start)
+        kept = search = match.end()
+        if first == '/':
+            replace(' ', start)
+        elif first == '#':
+            if disabled.match(source, start):
+                kept = search = skip_disabled(source, kept, endpos)
+        else:
+            opening = 'R"' if first == 'R' else first
+            quote = '"' if first == 'R' else first
+            replace(opening, start)
+            if kept - start > len(opening) and char(kept - 1) == quote:
+                emit(kept - 1, kept)
+    emit(kept, endpos)
+    return text_starts, source_starts
+
+def is_digit_separator(start: int, char: Callable[[int], str]) -> bool:
+    """Whether the quote at start is inside a number, as in 1'000 or 0xFF'FF"""
+    i = start
+    while i > 0 and (char(i - 1).isalnum() or char(i - 1) in "_'"):
+        i -= 1
+    return i < start and char(i).isdigit()
+
+def skip_disabled(source, pos: int, endpos: int) -> int:
+    """The end of the `#else`, `#elif` or `#endif` line closing an `#if 0` region"""
+    binary = not isinstance(source, str)
+    depth = 0
+    for match in (CONDITIONAL_BYTES if binary else CONDITIONAL).finditer(source, pos, endpos):
+        directive = match.group(1).decode() if binary else match.group(1)
+        if directive.startswith('if'):
+            depth += 1
+        elif directive == 'endif' and depth > 0:
+            depth -= 1
+        elif depth == 0:
+            return match.end()
+    return endpos
@@ -0,0 +1,116 @@
+import os, sys, json, stat, threading
+from os import path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, TextIO
+from cppgen.api import Options, generate_one, warm_up
+
+# Requests of one input waiting or running at once
+MAX_PENDING = 64
+
+# Fields of a request, and their defaults, which are those of the command line:
+#   id          echoed in the response
+#   path        the header file to read, or
+#   source      the header text, with `name` as the header file name
+#   convention  default, gnu or google
+#   indent      convention, space or tab
+#   tabsize     0 follows the convention
+#   todo        insert todo comments
+#   cpp, ipp    suffixes of the definition file
+# A response has the id, and either the definition file name (`filename`),
+# whether it holds inline/template definitions (`ipp`) and its `source`,
+# or an `error`.
+
+def handle(request: dict, defaults: Options = Options()) -> dict:
+    if 'source' in request:
+        source = request['source']
+        header_name = request.get('name', 'header.hpp')
+    elif 'path' in request:
+        with open(request['path'], 'r') as f:
+            source = f.read()
+        header_name = request['path']
+    else:
+        raise ValueError('request has neither path nor source')
+    options = Options(request.get('convention', defaults.convention), request.get('indent', defaults.indent),
+                      int(request.get('tabsize', defaults.tabsize)), bool(request.get('todo', defaults.todo)),
+                      request.get('cpp', defaults.cpp), request.get('ipp', defaults.ipp))
+    return generate_one(header_name, source, options)._asdict()
+
+def respond(line: str, defaults: Options = Options()) -> dict:
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError('request is not an object')
+    except ValueError as e:
+        return {'id': None, 'error': f'{type(e).__name__}: {e}'}
+    try:
+        response = handle(request, defaults)
+    except Exception as e:
+        response = {'error': f'{type(e).__name__}: {e}'}
+    return {'id': request.get('id'), **response}
+
+def serve_lines(lines: Iterable[str], write: Callable[[str], None], pool: ThreadPoolExecutor,
+                defaults: Options = Options()) -> None:
+    """Answers each request line in the pool; responses are written as they complete,
+    so they may be out of order. Lines are only read while fewer than MAX_PENDING
+    requests are waiting or running, so a long input is never held all at once."""
+    lock = threading.Lock()
+    pending = threading.BoundedSemaphore(MAX_PENDING)
+    errors = []
+
+    def reply(line: str) -> None:
+        try:
+            text = json.dumps(respond(line, defaults)) + '\n'
+            with lock:
+                write(text)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pending.release()
+
+    for line in lines:
+        if line.strip():
+            pending.acquire()
+            pool.submit(reply, line)
+    for _ in range(MAX_PENDING):
+        pending.acquire()
+    if errors:
+        raise errors[0]
+
+def serve_stream(stdin: TextIO, stdout: TextIO, pool: ThreadPoolExecutor, defaults: Options = Options()) -> None:
+    def write(text: str) -> None:
+        stdout.write(text)
+        stdout.flush()
+    serve_lines(stdin, write, pool, defaults)
+
+def serve_socket(address: str, pool: ThreadPoolExecutor, defaults: Options = Options()) -> None:
+    import socketserver, signal
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write(text: str) -> None:
+                self.wfile.write(text.encode())
+                self.wfile.flush()
+            serve_lines((line.decode() for line in self.rfile), write, pool, defaults)
+
+    # Replace the socket of a previous server, but never another kind of file
+    if path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+        os.remove(address)
+    with socketserver.ThreadingUnixStreamServer(address, Handler) as server:
+        server.daemon_threads = True
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(address)
+
+def serve(address: str, defaults: Options = Options()) -> None:
+    """Serves JSON-lines requests on stdin ('-') until end of input, or on a Unix socket.
+    Requests without options take those of defaults."""
+    warm_up()
+    with ThreadPoolExecutor() as pool:
+        if address == '-':
+            serve_stream(sys.stdin, sys.stdout, pool, defaults)
+        else:
+            serve_socket(address, pool, defaults)
@@ -0,0 +1,113 @@
+import sys, json, time, threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+PHASES = ['read', 'prepass', '_fetch_namespaces', '_fetch_classes', '_fetch_functions', 'render', 'write']
+COUNTS = ['bytes_in', 'bytes_out', 'namespace_matches', 'class_matches', 'statements',
+          'namespaces', 'classes', 'functions', 'cache_hits']
+
+class FileStats:
+    """Wall time per phase and counts for one header"""
+    filename: str
+    seconds: dict[str, float]
+    counts: dict[str, int]
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTS, 0)
+
+    def asdict(self) -> dict:
+        return {'file': self.filename, 'seconds': self.seconds, 'counts': self.counts}
+
+_local = threading.local()
+
+def active() -> Optional[FileStats]:
+    """The stats being recorded on this thread, if any"""
+    return getattr(_local, 'stats', None)
+
+@contextmanager
+def recording(stats: FileStats) -> Iterator[FileStats]:
+    """Records phases and counts on this thread into stats"""
+    previous = active()
+    _local.stats = stats
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    stats = active()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.seconds[name] = stats.seconds.get(name, 0.0) + time.perf_counter() - start
+
+def count(name: str, n: int = 1) -> None:
+    stats = active()
+    if stats is not None:
+        stats.counts[name] = stats.counts.get(name, 0) + n
+
+# Called with the stats of each header once it is generated, by the command line, --watch,
+# --serve or cppgen.api, e.g. to forward them to telemetry; possibly from several threads
+hooks: list[Callable[[FileStats], None]] = []
+
+def add_hook(hook: Callable[[FileStats], None]) -> None:
+    hooks.append(hook)
+
+def remove_hook(hook: Callable[[FileStats], None]) -> None:
+    hooks.remove(hook)
+
+def emit(stats: FileStats) -> None:
+    """Passes the stats of a header to the hooks"""
+    for hook in hooks:
+        hook(stats)
+
+class Report:
+    """The stats of every header in a run, and their totals"""
+    files: list[FileStats]
+
+    def __init__(self):
+        self.files = []
+
+    def add(self, stats: FileStats) -> None:
+        self.files.append(stats)
+        emit(stats)
+
+    def total(self) -> FileStats:
+        result = FileStats('total')
+        for stats in self.files:
+            for name, value in stats.seconds.items():
+                result.seconds[name] = result.seconds.get(name, 0.0) + value
+            for name, value in stats.counts.items():
+                result.counts[name] = result.counts.get(name, 0) + value
+        return result
+
+    def asdict(self) -> dict:
+        return {'files': [stats.asdict() for stats in self.files], 'total': self.total().asdict()}
+
+    def table(self) -> str:
+        columns = [name.strip('_').replace('fetch_', '') + ' ms' for name in PHASES]
+        counts = ['bytes_in', 'bytes_out', 'namespaces', 'classes', 'functions']
+        total = self.total()
+        width = max([len(stats.filename) for stats in self.files] + [len('file')])
+        lines = [f'{"file":<{width}} ' + ' '.join(f'{title:>12}' for title in columns + counts)]
+        for stats in self.files + [total]:
+            lines.append(f'{stats.filename:<{width}} '
+                         + ' '.join(f'{stats.seconds[name] * 1000:>12.2f}' for name in PHASES)
+                         + ' ' + ' '.join(f'{stats.counts[name]:>12}' for name in counts))
+        lines.append(', '.join(f'{total.counts[name]} {name}'
+                               for name in ['namespace_matches', 'class_matches', 'statements', 'cache_hits']))
+        return '\n'.join(lines)
+
+    def write(self, format: str, file=sys.stderr) -> None:
+        if format == 'json':
+            json.dump(self.asdict(), file, indent=2)
+            file.write('\n')
+        else:
+            file.write(self.table() + '\n')
@@ -0,0 +1,178 @@
+from __future__ import annotations
+from typing import Optional
+import re
+from cppgen.nodes import Ptn, Func
+from cppgen.prepass import reduce
+from cppgen.utils import match_braces
+
+Signature = tuple[str, tuple[str, ...], bool]
+
+BUILTIN_TYPES = {
+    'void', 'bool', 'char', 'wchar_t', 'char8_t', 'char16_t', 'char32_t',
+    'short', 'int', 'long', 'signed', 'unsigned', 'float', 'double', 'auto',
+}
+# Words that alone are not a type, as in the unnamed parameters const Foo and struct Foo
+TYPE_PREFIXES = {'const', 'volatile', 'struct', 'class', 'enum', 'union', 'typename'}
+
+BOUNDARY = re.compile(r'[;{}]')
+NAMESPACE_HEAD = re.compile(rf'\bnamespace\s+({Ptn.IDENTIFIER.pattern})\s*$')
+EXTERN_HEAD = re.compile(r'\bextern\s*"[^"]*"\s*$')
+COMMENT = re.compile(r'//[^\n]*|/\*.*?\*/|^\s*#[^\n]*', re.S | re.M)
+TOKEN = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*|::|\S')
+
+def is_word(token: str) -> bool:
+    return token[0].isalnum() or token[0] == '_'
+
+def join_tokens(tokens: list[str]) -> str:
+    result = ''
+    for tok in tokens:
+        if result and is_word(tok) and is_word(result[-1]):
+            result += ' '
+        result += tok
+    return result
+
+def normalize_name(name: str) -> str:
+    return join_tokens(TOKEN.findall(name))
+
+def split_params(params: str) -> list[str]:
+    """Splits a parameter list at top-level commas, dropping default arguments"""
+    result = []
+    depth = 0
+    start = 0
+    default = None
+    for i, ch in enumerate(params):
+        if ch in '(<[{':
+            depth += 1
+        elif ch in ')>]}':
+            depth -= 1
+        elif ch == '=' and depth == 0 and default is None:
+            default = i
+        elif ch == ',' and depth == 0:
+            result.append(params[start:default if default is not None else i])
+            start = i + 1
+            default = None
+    result.append(params[start:default if default is not None else len(params)])
+    return [p.strip() for p in result if p.strip()]
+
+def param_type(param: str) -> str:
+    """The type of a parameter declaration, without its name"""
+    tokens = TOKEN.findall(param)
+    if len(tokens) >= 2 and is_word(tokens[-1]) and tokens[-2] != '::' \
+    and tokens[-1] not in BUILTIN_TYPES \
+    and any(is_word(tok) and tok not in TYPE_PREFIXES for tok in tokens[:-1]):
+        tokens.pop()
+    return join_tokens(tokens)
+
+def param_types(params: str) -> tuple[str, ...]:
+    types = tuple(param_type(p) for p in split_params(params))
+    return () if types == ('void',) else types
+
+def is_const(tail_specifiers: Optional[str]) -> bool:
+    return tail_specifiers is not None and re.search(r'\bconst\b', tail_specifiers) is not None
+
+def signature(fn: Func) -> Signature:
+    """The qualified name and parameter types of a declaration"""
+    root_ns = fn.root_ns
+    name = root_ns.name + '::' + fn.rel_name if root_ns is not None else fn.rel_name
+    return normalize_name(name), param_types(fn.parameters), is_const(fn.tail_specifiers)
+
+def skip_balanced(tokens: list[str], i: int, step: int) -> int:
+    """The index of the bracket matching tokens[i], or -1"""
+    open, close = tokens[i], {'(': ')', ')': '(', '<': '>', '>': '<'}[tokens[i]]
+    depth = 0
+    while 0 <= i < len(tokens):
+        if tokens[i] == open:
+            depth += 1
+        elif tokens[i] == close:
+            depth -= 1
+            if depth == 0:
+                return i
+        i += step
+    return -1
+
+def parse_definition(head: str, scope: str) -> Optional[Signature]:
+    """The signature of a function definition from the text before its body"""
+    head = COMMENT.sub(' ', head)
+    matches = list(TOKEN.finditer(head))
+    tokens = [m.group() for m in matches]
+    i = 0
+    while i + 1 < len(tokens) and tokens[i] == 'template' and tokens[i + 1] == '<':
+        i = skip_balanced(tokens, i + 1, 1) + 1
+        if i == 0:
+            return None
+    if '(' not in tokens[i:]:
+        return None
+    paren = tokens.index('(', i)
+    if paren + 2 < len(tokens) and tokens[paren - 1] == 'operator' and tokens[paren + 1] == ')':
+        paren += 2
+    if tokens[paren] != '(' or paren == i:
+        return None
+    name_start = paren - 1
+    if 'operator' in tokens[i:paren]:
+        name_start = max(k for k in range(i, paren) if tokens[k] == 'operator')
+    elif not is_word(tokens[name_start]):
+        return None
+    if name_start > i and tokens[name_start - 1] == '~':
+        name_start -= 1
+    while name_start - 2 >= i and tokens[name_start - 1] == '::':
+        name_start -= 2
+        if tokens[name_start] == '>':
+            name_start = skip_balanced(tokens, name_start, -1) - 1
+            if name_start < i:
+                return None
+    close = skip_balanced(tokens, paren, 1)
+    if close < 0:
+        return None
+    params = head[matches[paren].end():matches[close].start()]
+    tail = re.split(r'(?<!:):(?!:)|->', join_tokens(tokens[close + 1:]), 1)[0]
+    name = join_tokens(tokens[name_start:paren])
+    if scope:
+        name = scope + '::' + name
+    return name, param_types(params), is_const(tail)
+
+class Definitions:
+    """The function definitions of a definition file"""
+    source: str
+    signatures: set[Signature]
+    namespaces: dict[str, int]
+
+    def __init__(self, source: str):
+        self.source = source
+        self.signatures = set()
+        self.namespaces = {}
+        self._scan()
+
+    def __contains__(self, signature: Signature) -> bool:
+        return signature in self.signatures
+
+    def _scan(self) -> None:
+        # Braces and semicolons in comments, literals and disabled blocks are not boundaries
+        reduced = reduce(self.source)
+        text = reduced.text
+        braces = match_braces(text)
+        scopes = []
+        start = 0
+        pos = 0
+        while True:
+            match = BOUNDARY.search(text, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group() == '{':
+                head = text[start:match.start()]
+                ns = NAMESPACE_HEAD.search(head)
+                if EXTERN_HEAD.search(head):
+                    scopes.append(scopes[-1] if scopes else '')
+                elif ns is not None:
+                    name = normalize_name(ns.group(1))
+                    scopes.append(scopes[-1] + '::' + name if scopes else name)
+                    if len(scopes) == 1 and match.start() in braces:
+                        self.namespaces[name] = reduced.to_source(braces[match.start()] - 1)
+                else:
+                    sig = parse_definition(head, scopes[-1] if scopes else '')
+                    if sig is not None:
+                        self.signatures.add(sig)
+                    pos = braces.get(match.start(), len(text))
+            elif match.group() == '}' and scopes:
+                scopes.pop()
+            start = pos
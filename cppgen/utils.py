@@ -1,5 +1,8 @@
-import re
-from typing import Optional
+import os, sys, re, stat
+from os import path
+from typing import Callable, Iterable, Optional
+
+BRACES = re.compile(r'[{}]')
 
 def ptn(pattern) -> str:
     result = re.sub(r'\[ \\t\\n\]\+', ' ', pattern.strip())
@@ -11,9 +14,77 @@ def recur_ptn(pattern, n=8) -> str:
         ptn = ptn.replace(r'?R', pattern)
     return ptn.replace('|(?R)', '').replace('|(?:?R)', '')
 
+class lazy_ptn:
+    """A class attribute holding a regex compiled on first access.
+    The compiled pattern replaces the attribute, so it is built once per process."""
+    build: Callable[[], str]
+    flags: int
+
+    def __init__(self, build: Callable[[], str], flags: int = 0):
+        self.build = build
+        self.flags = flags
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner) -> re.Pattern:
+        compiled = re.compile(self.build(), self.flags)
+        setattr(owner, self.name, compiled)
+        return compiled
+
+def match_braces(source: str, pos: int = 0, endpos: int = sys.maxsize) -> dict[int, int]:
+    """Maps the offset of every '{' to the offset just past its matching '}'"""
+    result = {}
+    stack = []
+    for match in BRACES.finditer(source, pos, endpos):
+        if match.group() == '{':
+            stack.append(match.start())
+        elif stack:
+            result[stack.pop()] = match.end()
+    return result
+
+def is_balanced(source: str, pos: int = 0, endpos: int = sys.maxsize) -> bool:
+    depth = 0
+    for match in BRACES.finditer(source, pos, endpos):
+        depth += 1 if match.group() == '{' else -1
+        if depth < 0:
+            return False
+    return depth == 0
+
 def xstrip(str: Optional[str]) -> str:
     return str.strip() if str is not None else None
 
+def xintern(str: Optional[str]) -> str:
+    return sys.intern(str) if str is not None else None
+
+def umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+def write_atomic(filename: str, fragments: Iterable[str]) -> None:
+    """Streams fragments into a temporary file, then renames it over filename.
+    An interrupted write never leaves a partial file behind."""
+    import tempfile
+    fd, tmpname = tempfile.mkstemp(dir=path.dirname(filename) or '.',
+                                   prefix='.' + path.basename(filename) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            for fragment in fragments:
+                f.write(fragment)
+        try:
+            mode = stat.S_IMODE(os.stat(filename).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~umask()
+        os.chmod(tmpname, mode)
+        os.replace(tmpname, filename)
+    except BaseException:
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+        raise
+
 def query_yn(question: str) -> bool:
     while True:
         print(question + ' [y/n]', end=' ')
@@ -0,0 +1,222 @@
+import os, sys, time, select, struct, hashlib, argparse, ctypes, ctypes.util
+from os import path
+from contextlib import nullcontext
+from typing import Optional
+from cppgen import stats
+from cppgen.convention import Convention
+from cppgen.cache import Cache
+from cppgen.discover import find, selected
+from cppgen.stats import FileStats
+from cppgen.cppgen import process
+from cppgen.utils import write_atomic
+
+# Seconds without further changes before a burst of saves is processed
+DEBOUNCE = 0.2
+POLL_INTERVAL = 1.0
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+EVENT = struct.Struct('iIII')
+
+class Poller:
+    """Finds changed headers by comparing modification times"""
+    roots: list[str]
+    args: argparse.Namespace
+    mtimes: dict[str, tuple[int, int]]
+
+    def __init__(self, roots: list[str], args: argparse.Namespace):
+        self.roots = roots
+        self.args = args
+        self.mtimes = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        result = {}
+        for filename in find(self.roots, self.args.include, self.args.exclude, self.args.gitignore):
+            try:
+                st = os.stat(filename)
+            except OSError:
+                continue
+            result[filename] = (st.st_mtime_ns, st.st_size)
+        return result
+
+    def changes(self, timeout: Optional[float]) -> set[str]:
+        time.sleep(POLL_INTERVAL if timeout is None else timeout)
+        mtimes = self._scan()
+        changed = {f for f in mtimes.keys() | self.mtimes.keys() if mtimes.get(f) != self.mtimes.get(f)}
+        self.mtimes = mtimes
+        return changed
+
+    def close(self) -> None:
+        pass
+
+class Inotify:
+    """Finds changed headers with inotify(7), watching every directory under the roots"""
+    roots: list[str]
+    args: argparse.Namespace
+
+    def __init__(self, roots: list[str], args: argparse.Namespace):
+        self.roots = roots
+        self.args = args
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._dirs = {}
+        for root in roots:
+            self._add_tree(root, root)
+
+    def _add_tree(self, root: str, directory: str) -> None:
+        mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for dirpath, _, _ in os.walk(directory):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), mask)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed: {dirpath}')
+            self._dirs[wd] = (root, dirpath)
+
+    def _selected(self, root: str, filename: str) -> bool:
+        return selected(root, filename, self.args.include, self.args.exclude, self.args.gitignore)
+
+    def changes(self, timeout: Optional[float]) -> set[str]:
+        changed = set()
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return changed
+        data = os.read(self._fd, 64 * 1024)
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, pos)
+            name = os.fsdecode(data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b'\0'))
+            pos += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                changed.update(find(self.roots, self.args.include, self.args.exclude, self.args.gitignore))
+                continue
+            if wd not in self._dirs:
+                continue
+            root, directory = self._dirs[wd]
+            filename = path.join(directory, name)
+            if mask & IN_ISDIR:
+                # A directory moved or created under a root may already hold headers
+                if mask & (IN_CREATE | IN_MOVED_TO) and path.isdir(filename):
+                    self._add_tree(root, filename)
+                    changed.update(f for f in find([filename]) if self._selected(root, f))
+            elif self._selected(root, filename):
+                changed.add(filename)
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+def file_digest(filename: str) -> Optional[str]:
+    try:
+        with open(filename, 'r', encoding='utf-8', newline='') as f:
+            return digest(f.read())
+    except (OSError, UnicodeDecodeError):
+        return None
+
+class Watcher:
+    """Regenerates the definitions of changed headers.
+    Without --merge, only outputs that are unchanged since they were last
+    rendered are rewritten, so definitions filled in by hand are kept."""
+    args: argparse.Namespace
+    conv: Convention
+    cache: Optional[Cache]
+    # Header -> definition file and the digest of its last rendered source
+    rendered: dict[str, tuple[str, str]]
+
+    def __init__(self, args: argparse.Namespace, conv: Convention, cache: Optional[Cache]):
+        self.args = args
+        self.conv = conv
+        self.cache = cache
+        self.rendered = {}
+
+    def is_definition(self, filename: str) -> bool:
+        return filename.endswith(self.args.cpp) or filename.endswith(self.args.ipp)
+
+    def adopt(self, filename: str) -> None:
+        """Records the definition file of a header if it matches what would be rendered"""
+        if self.is_definition(filename) or self.args.merge:
+            return
+        try:
+            new_filename, fragments, *_ = process(filename, self.args, self.conv, self.cache)
+            text = ''.join(fragments)
+        except Exception:
+            return
+        if file_digest(new_filename) == digest(text):
+            self.rendered[filename] = (new_filename, digest(text))
+
+    def update(self, filename: str) -> None:
+        if self.is_definition(filename):
+            return
+        if not path.exists(filename):
+            self.rendered.pop(filename, None)
+            return
+        record = FileStats(filename) if stats.hooks else None
+        with stats.recording(record) if record is not None else nullcontext():
+            processed = self._update(filename)
+        if record is not None and processed:
+            stats.emit(record)
+
+    def _update(self, filename: str) -> bool:
+        """Whether the header was processed without error"""
+        try:
+            new_filename, fragments, merged, _ = process(filename, self.args, self.conv, self.cache)
+            text = ''.join(fragments)
+        except Exception as e:
+            print(f'Error: {filename} ({type(e).__name__}: {e})')
+            return False
+        if merged == 0:
+            return True
+        current = file_digest(new_filename) if path.exists(new_filename) else None
+        if current == digest(text):
+            self.rendered[filename] = (new_filename, current)
+            return True
+        if merged is None and current is not None and self.rendered.get(filename) != (new_filename, current):
+            print(f'Skip: {filename} (definition already exists)')
+            return True
+        try:
+            with stats.phase('write'):
+                write_atomic(new_filename, [text])
+            stats.count('bytes_out', len(text.encode()))
+        except Exception as e:
+            print(f'Error: {filename} ({type(e).__name__}: {e})')
+            return False
+        self.rendered[filename] = (new_filename, digest(text))
+        if merged is not None:
+            print(f'Merge: {filename} -> {new_filename} ({merged} new)')
+        else:
+            print(f'Generate: {filename} -> {new_filename}')
+        sys.stdout.flush()
+        return True
+
+def watch(roots: list[str], args: argparse.Namespace, conv: Convention, cache: Optional[Cache]) -> None:
+    """Regenerates definitions as headers under the roots change, until interrupted"""
+    watcher = Watcher(args, conv, cache)
+    for filename in find(roots, args.include, args.exclude, args.gitignore):
+        watcher.adopt(filename)
+    try:
+        source = Inotify(roots, args)
+    except (OSError, AttributeError):
+        source = Poller(roots, args)
+    print(f'Watching: {" ".join(roots)}')
+    sys.stdout.flush()
+    pending = set()
+    try:
+        while True:
+            changed = source.changes(DEBOUNCE if pending else None)
+            if changed:
+                pending |= changed
+                continue
+            for filename in sorted(pending):
+                watcher.update(filename)
+            pending = set()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        source.close()
@@ -0,0 +1,21 @@
+import unittest
+from cppgen.declarations import TOKEN, parse
+from cppgen.nodes import Tree
+
+def tokens(statement: str) -> list[str]:
+    return TOKEN.findall(statement)
+
+class ParseTest(unittest.TestCase):
+    def test_function(self):
+        _, decl = parse(tokens('static const int *f(int a, char b) const noexcept'))
+        self.assertEqual(decl.name, 'f')
+        self.assertEqual(decl.return_type, 'const int *')
+        self.assertEqual(decl.parameters, 'int a, char b')
+
+    def test_unclosed_parameters(self):
+        for statement in ['__attribute__((x)) void f(int', 'template <int (N)> void g(int']:
+            self.assertIsNone(parse(tokens(statement)), statement)
+            self.assertEqual(Tree(statement + ';').functions, [], statement)
+
+if __name__ == '__main__':
+    unittest.main()
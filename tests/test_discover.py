@@ -0,0 +1,33 @@
+import os, unittest, tempfile
+from os import path
+from cppgen.discover import find
+
+class FindTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(path.join(self.root, 'src', 'sub'))
+        for name in ('src/a.hpp', 'src/sub/b.h', 'src/sub/c.cpp'):
+            with open(path.join(self.root, name), 'w') as f:
+                f.write('void f();\n')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def find(self, *args) -> list[str]:
+        return [path.relpath(filename, self.root) for filename in find([path.join(self.root, 'src')], *args)]
+
+    def test_sorted(self):
+        self.assertEqual(self.find(), ['src/a.hpp', 'src/sub/b.h'])
+
+    def test_exclude(self):
+        self.assertEqual(self.find(None, ['sub']), ['src/a.hpp'])
+
+    @unittest.skipUnless(hasattr(os, 'symlink'), 'no symbolic links')
+    def test_symlink_loops(self):
+        os.symlink('..', path.join(self.root, 'src', 'sub', 'up'))
+        os.symlink('self', path.join(self.root, 'src', 'self'))
+        self.assertEqual(self.find(), ['src/a.hpp', 'src/sub/b.h'])
+
+if __name__ == '__main__':
+    unittest.main()
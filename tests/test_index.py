@@ -0,0 +1,83 @@
+import os, pickle, unittest, tempfile
+from os import path
+from cppgen import index
+from cppgen.cppgen import arg_parser, convention_of, process
+from cppgen.index import Index
+
+HEADER = '''namespace n {
+void f();
+void g(int i);
+}
+'''
+
+class IndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.write('src/a.cpp', 'void n::f() {}\n')
+        self.write('src/b.cpp', 'namespace n { void f() {} void h() {} }\n')
+        self.write('src/a.hpp', HEADER)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        index._loaded.clear()
+
+    def write(self, name: str, text: str) -> None:
+        filename = path.join(self.root, name)
+        os.makedirs(path.dirname(filename), exist_ok=True)
+        with open(filename, 'w') as f:
+            f.write(text)
+
+    def index(self, filename=None) -> Index:
+        result = Index(filename)
+        result.update([path.join(self.root, 'src')])
+        return result
+
+    def test_update(self):
+        result = self.index()
+        self.assertIn(('n::f', (), False), result)
+        self.assertIn(('n::h', (), False), result)
+        self.assertEqual(result.update([path.join(self.root, 'src')]), 0)
+        self.write('src/b.cpp', 'void n::g(int) {}\n')
+        os.remove(path.join(self.root, 'src', 'a.cpp'))
+        self.assertEqual(result.update([path.join(self.root, 'src')]), 2)
+        self.assertEqual(set(result.counts), {('n::g', ('int',), False)})
+
+    def test_elsewhere(self):
+        result = self.index()
+        elsewhere = result.elsewhere(path.join(self.root, 'src', 'a.cpp'))
+        self.assertIn(('n::f', (), False), elsewhere)
+        self.assertNotIn(('n::g', ('int',), False), elsewhere)
+        elsewhere = result.elsewhere(path.join(self.root, 'src', 'b.cpp'))
+        self.assertIn(('n::f', (), False), elsewhere)
+        self.assertNotIn(('n::h', (), False), elsewhere)
+
+    def test_defined_elsewhere(self):
+        self.write('src/b.cpp', 'namespace n { void f() {} }\n')
+        os.remove(path.join(self.root, 'src', 'a.cpp'))
+        args = arg_parser().parse_args([path.join(self.root, 'src', 'a.hpp')])
+        output = process(args.files[0], args, convention_of(args), index=self.index())
+        source = ''.join(output.source)
+        self.assertNotIn('void f', source)
+        self.assertIn('void g', source)
+
+    def test_save(self):
+        filename = path.join(self.root, 'index', 'i.json')
+        result = self.index(filename)
+        result.save()
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy.counts, result.counts)
+        self.assertIs(pickle.loads(pickle.dumps(result)), copy)
+
+    def test_failed_save(self):
+        # The directory of the index is a file, so the index is copied rather than read again
+        filename = path.join(self.root, 'src', 'a.cpp', 'i.json')
+        result = self.index(filename)
+        result.save()
+        self.assertFalse(result.saved)
+        copy = pickle.loads(pickle.dumps(result))
+        self.assertEqual(copy.counts, result.counts)
+        self.assertTrue(copy.counts)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import cppgen.nodes as nodes
+from cppgen.nodes import Namespace, Class
+
+DEPTH = 12
+
+def nested(depth: int, namespaces: int) -> str:
+    """Namespaces, then classes, nested depth levels deep, with a method at each
+    level before and after the next one, and a sibling class at the innermost"""
+    source = ''
+    for i in range(depth):
+        if i < namespaces:
+            source += f'namespace n{i} {{\n'
+        else:
+            source += f'class C{i} {{\npublic:\n'
+        source += f'void before{i}(int a);\n'
+    source += 'class Leaf { void leaf(); };\n'
+    for i in reversed(range(depth)):
+        source += f'void after{i}(int b);\n'
+        source += '}\n' if i < namespaces else '};\n'
+    return source
+
+class TreeShapeTest(unittest.TestCase):
+    def check_chain(self, tree: nodes.Tree, namespaces: int):
+        scopes = sorted(tree.namespaces + tree.classes, key=lambda node: node.start)
+        leaf = scopes.pop()
+        self.assertEqual(len(scopes), DEPTH)
+        root = scopes[0] if namespaces else None
+        # Names relative to the root namespace, which is left out
+        prefixes = []
+        prefix = ''
+        for i, scope in enumerate(scopes):
+            self.assertIsInstance(scope, Namespace if i < namespaces else Class)
+            self.assertIs(scope.parent, scopes[i - 1] if i else None)
+            if i or not namespaces:
+                prefix = prefix + '::' + scope.name if prefix else scope.name
+            prefixes.append(prefix)
+        self.assertIs(leaf.parent, scopes[-1])
+
+        functions = {fn.name: fn for fn in tree.functions}
+        self.assertEqual(len(functions), 2 * DEPTH + 1)
+        self.assertIs(functions['leaf'].parent, leaf)
+        self.assertEqual(functions['leaf'].rel_name, prefixes[-1] + '::Leaf::leaf')
+        for i, scope in enumerate(scopes):
+            for name in (f'before{i}', f'after{i}'):
+                fn = functions[name]
+                self.assertIs(fn.parent, scope)
+                self.assertIs(fn.root_ns, root)
+                self.assertEqual(fn.rel_name, prefixes[i] + '::' + name if prefixes[i] else name)
+        self.assertEqual(tree.get_functions_for(root), tree.functions)
+
+    def test_namespaces_and_classes(self):
+        self.check_chain(nodes.Tree(nested(DEPTH, DEPTH // 2)), DEPTH // 2)
+
+    def test_namespaces(self):
+        self.check_chain(nodes.Tree(nested(DEPTH, DEPTH)), DEPTH)
+
+    def test_classes(self):
+        self.check_chain(nodes.Tree(nested(DEPTH, 0)), 0)
+
+    def test_siblings(self):
+        tree = nodes.Tree('namespace a { namespace b { class X { void x(); }; }\n'
+                          'namespace c { class Y { void y(); }; void z(); } }\n'
+                          'namespace d { void w(); }\n')
+        a, b, c, d = tree.namespaces
+        x, y = tree.classes
+        self.assertEqual([ns.parent for ns in tree.namespaces], [None, a, a, None])
+        self.assertEqual([x.parent, y.parent], [b, c])
+        self.assertEqual([fn.rel_name for fn in tree.functions], ['b::X::x', 'c::Y::y', 'c::z', 'w'])
+        self.assertEqual([fn.root_ns for fn in tree.functions], [a, a, a, d])
+        self.assertEqual(tree.get_functions_for(a), tree.functions[:3])
+        self.assertEqual(tree.get_functions_for(d), tree.functions[3:])
+
+    def test_templates(self):
+        tree = nodes.Tree('namespace n { template <typename T> class A {\n'
+                          'template <typename U, class V> struct B { void f(); }; }; }\n')
+        a, b = tree.classes
+        self.assertIs(b.parent, a)
+        self.assertEqual(tree.functions[0].rel_name, 'A<T>::B<U,V>::f')
+
+if __name__ == '__main__':
+    unittest.main()
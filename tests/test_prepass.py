@@ -0,0 +1,37 @@
+import unittest
+import cppgen.nodes as nodes
+from cppgen.prepass import reduce, reduce_bytes
+
+class ReduceTest(unittest.TestCase):
+    def test_comments_and_literals(self):
+        source = 'int f(char c = \'{\', const char *s = "};"); // }\n/* { */ int g();\n'
+        self.assertEqual(reduce(source).text, 'int f(char c = \'\', const char *s = "");  \n  int g();\n')
+
+    def test_disabled(self):
+        source = 'void f();\n#if 0\n{\n#else\nvoid g();\n#endif\n'
+        self.assertEqual(reduce(source).text, 'void f();\n\nvoid g();\n\n')
+
+    def test_digit_separators(self):
+        for number in ("1'000", "0xFF'FF", "0b1'0'1", "1'000.5'5"):
+            source = f'int f(int a = {number});'
+            self.assertEqual(reduce(source).text, source, number)
+
+    def test_prefixed_literals(self):
+        for prefix in ('L', 'u', 'U', 'u8'):
+            source = f"void sep(wchar_t c = {prefix}'{{'); void get();"
+            self.assertEqual(reduce(source).text, f"void sep(wchar_t c = {prefix}''); void get();", prefix)
+            self.assertEqual(reduce_bytes(source.encode()).text, reduce(source).text, prefix)
+
+    def test_prefixed_literal_in_class(self):
+        for literal in ("L'{'", "u'}'", "U'x'", "u8'\"'"):
+            tree = nodes.Tree(f'class A {{\n    void sep(wchar_t c = {literal});\n    void get();\n}};\n')
+            self.assertEqual([fn.name for fn in tree.functions], ['sep', 'get'], literal)
+
+    def test_offsets(self):
+        source = 'a /* x */ b "yz" c'
+        reduced = reduce(source)
+        for name in 'abc':
+            self.assertEqual(source[reduced.to_source(reduced.text.index(name))], name)
+
+if __name__ == '__main__':
+    unittest.main()
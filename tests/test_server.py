@@ -0,0 +1,66 @@
+import json, threading, unittest
+from concurrent.futures import ThreadPoolExecutor
+from cppgen import server
+from cppgen.api import Options
+
+class ServeLinesTest(unittest.TestCase):
+    def test_responses(self):
+        lines = [json.dumps({'id': i, 'source': f'void f{i}(int a);', 'name': f'h{i}.hpp'}) + '\n' for i in range(200)]
+        lines[7] = 'not json\n'
+        lines[9] = '\n'
+        responses = []
+        with ThreadPoolExecutor(4) as pool:
+            server.serve_lines(lines, lambda text: responses.append(json.loads(text)), pool)
+        self.assertEqual(len(responses), 199)
+        by_id = {response['id']: response for response in responses}
+        self.assertEqual(sorted(id for id in by_id if id is not None), [i for i in range(200) if i not in (7, 9)])
+        self.assertIn('error', by_id[None])
+        self.assertEqual(by_id[3]['filename'], 'h3.cpp')
+        self.assertIn('f3 (int a)', by_id[3]['source'])
+
+    def test_defaults(self):
+        lines = ['{"id": 1, "source": "void f(int a);"}', '{"id": 2, "source": "void f(int a);", "todo": true, "cpp": ".cxx"}']
+        responses = []
+        with ThreadPoolExecutor(2) as pool:
+            server.serve_lines(lines, lambda text: responses.append(json.loads(text)), pool,
+                               Options(convention='gnu', todo=False, cpp='.cc'))
+        by_id = {response['id']: response for response in responses}
+        self.assertEqual(by_id[1]['filename'], 'header.cc')
+        self.assertNotIn('TODO', by_id[1]['source'])
+        self.assertIn('void\nf (int a)\n{', by_id[1]['source'])
+        self.assertEqual(by_id[2]['filename'], 'header.cxx')
+        self.assertIn('TODO', by_id[2]['source'])
+
+    def test_bounded(self):
+        read = 0
+        written = 0
+        most = 0
+        lock = threading.Lock()
+
+        def lines():
+            nonlocal read, most
+            for i in range(1000):
+                with lock:
+                    most = max(most, read - written)
+                    read += 1
+                yield json.dumps({'id': i, 'source': 'void f();'})
+
+        def write(text: str) -> None:
+            nonlocal written
+            with lock:
+                written += 1
+
+        with ThreadPoolExecutor(2) as pool:
+            server.serve_lines(lines(), write, pool)
+        self.assertEqual(written, 1000)
+        self.assertLessEqual(most, server.MAX_PENDING)
+
+    def test_write_error(self):
+        def write(text: str) -> None:
+            raise BrokenPipeError('closed')
+        with ThreadPoolExecutor(2) as pool:
+            with self.assertRaises(BrokenPipeError):
+                server.serve_lines(['{"source": ""}'] * 3, write, pool)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest import mock
+import cppgen.nodes as nodes
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+
+SOURCE = '''#pragma once
+
+namespace app {
+namespace net {
+
+class Socket {
+public:
+    Socket(int fd);
+    ~Socket();
+    int read(char* buf, int size);
+    struct Options {
+        int timeout;
+        bool keep_alive;
+        void reset();
+    };
+    template <typename T>
+    T get(const Options& options) const;
+private:
+    int fd_;
+};
+
+inline int wait(int ms) {
+    if (ms > 0) { return ms; }
+    return 0;
+}
+
+static const int PORTS[] = { 80, 443, 8080 };
+
+int connect(const char* host, int port);
+
+} // namespace net
+
+extern "C" {
+int app_init(void);
+void app_shutdown(int code);
+struct app_config { int flags; };
+int app_config_load(struct app_config* config, const char* path);
+void app_config_free(struct app_config* config);
+}
+
+namespace util {
+struct Point { int x, y; Point operator+(const Point& other) const; };
+void log(const char* message);
+template <typename T> T clamp(T value, T lo, T hi);
+enum class Level { Debug, Info };
+}
+
+} // namespace app
+
+void global_function(int a, int b = 2);
+'''
+
+class ShardsTest(unittest.TestCase):
+    def test_same_as_serial(self):
+        shards = []
+        find_in_shards = nodes.Tree._find_in_shards
+
+        def spy(tree, found, jobs):
+            shards.extend(found)
+            return find_in_shards(tree, found, jobs)
+
+        with mock.patch.object(nodes, 'SHARD_SIZE', 64), \
+             mock.patch.object(nodes.Tree, '_find_in_shards', spy):
+            serial = nodes.Tree(SOURCE)
+            parallel = nodes.Tree(SOURCE, jobs=2)
+        self.assertGreater(len(shards), 2)
+        self.assertEqual(generate('x.hpp', Convention(), parallel), generate('x.hpp', Convention(), serial))
+        self.assertEqual([(f.start, f.end) for f in parallel.functions],
+                         [(f.start, f.end) for f in serial.functions])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import io, os, unittest, tempfile
+from contextlib import redirect_stdout
+from os import path
+from cppgen import server, stats
+from cppgen.api import generate_many, generate_one
+from cppgen.cppgen import arg_parser, convention_of
+from cppgen.watch import Watcher
+
+HEADER = 'namespace n {\nvoid f();\n}\n'
+
+class HooksTest(unittest.TestCase):
+    def setUp(self):
+        self.received = []
+        stats.add_hook(self.received.append)
+
+    def tearDown(self):
+        stats.remove_hook(self.received.append)
+
+    def test_api(self):
+        generate_one('a.hpp', HEADER)
+        generate_many({'b.hpp': HEADER, 'c.hpp': HEADER.encode()}, jobs=2)
+        self.assertEqual([s.filename for s in self.received], ['a.hpp', 'b.hpp', 'c.hpp'])
+        for s in self.received:
+            self.assertEqual(s.counts['bytes_in'], len(HEADER))
+            self.assertEqual(s.counts['functions'], 1)
+            self.assertGreater(s.counts['bytes_out'], 0)
+
+    def test_serve(self):
+        server.respond('{"id": 1, "source": "void f();", "name": "d.hpp"}')
+        self.assertEqual([s.filename for s in self.received], ['d.hpp'])
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as root:
+            filename = path.join(root, 'e.hpp')
+            with open(filename, 'w') as f:
+                f.write(HEADER)
+            args = arg_parser().parse_args(['--no-cache', '--watch', root])
+            with redirect_stdout(io.StringIO()):
+                Watcher(args, convention_of(args), None).update(filename)
+            self.assertTrue(path.exists(path.join(root, 'e.cpp')))
+            os.remove(filename)
+        self.assertEqual([s.filename for s in self.received], [filename])
+        self.assertGreater(self.received[0].counts['bytes_out'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
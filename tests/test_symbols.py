@@ -0,0 +1,50 @@
+import unittest
+from cppgen.nodes import Tree
+from cppgen.symbols import Definitions, param_types, signature
+
+SOURCE = '''#include "p.hpp"
+
+namespace n {
+
+bool P::open(char c) {
+    return c == '{'; /* } */
+}
+
+// void P::commented() {}
+#if 0
+void P::disabled() {
+#endif
+
+void P::other() const {
+}
+
+} /* namespace n */
+'''
+
+class DefinitionsTest(unittest.TestCase):
+    def test_literals_and_comments(self):
+        definitions = Definitions(SOURCE)
+        self.assertEqual(definitions.signatures, {
+            ('n::P::open', ('char',), False),
+            ('n::P::other', (), True),
+        })
+
+    def test_namespace_close(self):
+        definitions = Definitions(SOURCE)
+        close = definitions.namespaces['n']
+        self.assertEqual(SOURCE[close:], '} /* namespace n */\n')
+
+    def test_param_types(self):
+        self.assertEqual(param_types('const Foo'), ('const Foo',))
+        self.assertEqual(param_types('struct Foo, const struct Foo'), ('struct Foo', 'const struct Foo'))
+        self.assertEqual(param_types('const Foo& foo, struct Foo *p, unsigned n'),
+                         ('const Foo&', 'struct Foo*', 'unsigned'))
+
+    def test_unnamed_parameters(self):
+        tree = Tree('void f(const Foo);\nvoid g(struct Foo);\n')
+        definitions = Definitions('void f(const Foo foo) {}\nvoid g(struct Foo foo) {}\n')
+        for fn in tree.functions:
+            self.assertIn(signature(fn), definitions)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import random, unittest
+import cppgen.nodes as nodes
+from cppgen.convention import Convention
+from cppgen.cppgen import generate
+
+HEADER = '''#pragma once
+#include <string>
+
+namespace app {
+namespace ui {
+
+/* A window { with braces } in a comment */
+class Window : public Widget {
+public:
+    Window(const std::string &title = "untitled {");
+    ~Window();
+    char separator(char c = '}') const;
+    template <typename T>
+    T property(const char *name) const;
+
+#if 0
+    void disabled();
+#endif
+private:
+    struct Layout {
+        void apply(int w, int h);
+    };
+};
+
+// void commented();
+int count(int a, int b);
+
+} /* namespace ui */
+
+template <typename T, typename U>
+class Pair {
+public:
+    Pair(T first, U second);
+    const T &first() const;
+    static Pair make(const char *s = R"(raw ) { string)");
+};
+
+inline int square(int x);
+
+} /* namespace app */
+
+namespace other {
+    void free_function(long n);
+}
+'''
+
+SNIPPETS = ['{', '}', '/*', '*/', '//', '"', "'", '\n#if 0\n', '\n#endif\n', '\n#define X {\n', 'R"(', ')"',
+            ';', '(', ')', '<', '>', '\\', '\n', ' ', 'x', 'void added(int x);', 'class Z { void z(); };',
+            'namespace q {', 'template <typename V>', 'int get() const;']
+
+def fields(node):
+    values = []
+    for cls in type(node).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            value = getattr(node, slot)
+            values.append((value.start, value.end) if isinstance(value, nodes.Node) else value)
+    return values
+
+def shape(tree: nodes.Tree):
+    groups = {}
+    for ns in [None] + tree.root_namespaces:
+        groups[ns.start if ns else None] = [fn.start for fn in tree.get_functions_for(ns)]
+    return ([fields(node) for node in tree.namespaces + tree.classes + tree.functions], groups,
+            generate('x.hpp', Convention(), tree))
+
+class UpdateTest(unittest.TestCase):
+    def check(self, tree: nodes.Tree, start: int, end: int, text: str):
+        before = tree.source
+        tree.update(start, end, text)
+        full = nodes.Tree(before[:start] + text + before[end:])
+        self.assertEqual(tree.source, full.source)
+        self.assertEqual(shape(tree), shape(full), (before, start, end, text))
+
+    def test_declarations(self):
+        for old, new in [('int count(int a, int b);', 'int count(int a);\nvoid more();'),
+                         ('Window();', 'Window();\n    void resize(int w, int h);'),
+                         ('apply', 'reapply'), ('inline int square(int x);', '')]:
+            tree = nodes.Tree(HEADER)
+            start = HEADER.index(old)
+            self.check(tree, start, start + len(old), new)
+
+    def test_unterminated(self):
+        for old, new in [('comment */', '"s"/'), ('comment */', ''), ('/* A window', '#if 0\n'),
+                         ('Window();', 'Window(const char *s = "'), ('// void', '/* void'),
+                         ('#endif', ''), ('raw )', 'raw')]:
+            tree = nodes.Tree(HEADER)
+            start = HEADER.index(old)
+            self.check(tree, start, start + len(old), new)
+
+    def test_random_edits(self):
+        rnd = random.Random(13)
+        for _ in range(300):
+            tree = nodes.Tree(HEADER)
+            for _ in range(8):
+                start = rnd.randrange(len(tree.source) + 1)
+                end = min(len(tree.source), start + rnd.choice([0, 0, 1, 5, 20]))
+                text = ''.join(rnd.choice(SNIPPETS) for _ in range(rnd.randrange(1, 4)))
+                self.check(tree, start, end, text)
+
+if __name__ == '__main__':
+    unittest.main()